@@ -0,0 +1,148 @@
+# benchmarks/bench_scaling.py
+"""Scaling benchmark for DecentralizedUAVSystem.
+
+Sweeps device count, UAV count, threat count and time slots one axis at a
+time around the base config, times every simulation phase separately
+through the system's Instrumentation hooks and records peak traced
+memory. System construction (layout, patrol planning, controller setup) is
+timed once per case as the 'build' phase. Results are written as JSON so runs from different versions can
+be diffed.
+
+    python -m benchmarks.bench_scaling --quick --output results/bench.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from copy import deepcopy
+
+import numpy as np
+
+from simulation.instrumentation import Instrumentation, MemorySink
+from simulation.simulation_manager import DecentralizedUAVSystem
+from simulation.sweep import apply_overrides
+
+# Per-slot phases reported by Instrumentation; 'build' is timed once around construction
+SLOT_PHASES = ('forecast', 'optimize', 'offload', 'threats', 'metrics')
+PHASES = ('build',) + SLOT_PHASES
+
+FULL_SWEEP = {
+    'iot.device_count': [100, 1000, 10000],
+    'uav.count': [3, 30, 300],
+    'threats.count': [10, 1000, 10000],
+    'time_slots': [10, 100, 1000],
+}
+
+QUICK_SWEEP = {
+    'iot.device_count': [100, 1000],
+    'uav.count': [3, 30],
+    'threats.count': [10, 1000],
+    'time_slots': [10, 50],
+}
+
+
+def run_instrumented(config, seed=0):
+    """Run one simulation with in-memory instrumentation and sum each phase over all slots."""
+    instruments = Instrumentation(MemorySink())
+    wall, cpu = time.perf_counter(), time.process_time()
+    system = DecentralizedUAVSystem(deepcopy(config), instruments=instruments, seed=seed)
+    phases = {name: {'wall_s': 0.0, 'cpu_s': 0.0} for name in PHASES}
+    phases['build'] = {'wall_s': time.perf_counter() - wall, 'cpu_s': time.process_time() - cpu}
+    for t in range(system.time_slots):
+        system.step(t)
+    counters = {}
+    for record in instruments.sink.records:
+        for name, entry in record['phases'].items():
+            phases[name]['wall_s'] += entry['wall_ms'] / 1000.0
+            phases[name]['cpu_s'] += entry['cpu_ms'] / 1000.0
+        for name, value in record['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+    return phases, counters
+
+
+def bench_case(config, seed, measure_memory=True):
+    run_start = time.perf_counter()
+    phases, counters = run_instrumented(config, seed)
+    run_s = time.perf_counter() - run_start
+
+    peak_mb = None
+    if measure_memory:
+        # Separate pass: tracemalloc would otherwise inflate the timings above
+        tracemalloc.start()
+        system = DecentralizedUAVSystem(deepcopy(config), seed=seed)
+        for t in range(system.time_slots):
+            system.step(t)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    slots = max(config['time_slots'], 1)
+    for name in SLOT_PHASES:
+        phases[name]['per_slot_ms'] = 1000.0 * phases[name]['wall_s'] / slots
+    return {
+        'run_s': run_s,
+        'phases': phases,
+        'counters': counters,
+        'peak_mem_mb': peak_mb,
+    }
+
+
+def code_version():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_sweep(base_config, sweep, seed=0, measure_memory=True):
+    cases = []
+    for key, values in sweep.items():
+        for value in values:
+            config = apply_overrides(base_config, {key: value})
+            print(f"[BENCH] {key}={value}")
+            result = bench_case(config, seed, measure_memory)
+            result.update({'axis': key, 'value': value, 'mode': config.get('mode')})
+            cases.append(result)
+    return {
+        'meta': {
+            'code_version': code_version(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': seed,
+            'base_config': base_config,
+        },
+        'cases': cases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--mode', default='pure')
+    parser.add_argument('--quick', action='store_true', help='smaller sweep for a fast sanity check')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        base_config = json.load(f)
+    base_config['mode'] = args.mode
+
+    report = run_sweep(base_config, QUICK_SWEEP if args.quick else FULL_SWEEP,
+                       seed=args.seed, measure_memory=not args.no_memory)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        print(f"[BENCH] Wrote {len(report['cases'])} cases to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
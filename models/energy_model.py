@@ -0,0 +1,110 @@
+# models/energy_model.py
+import numpy as np
+
+
+class CruiseCost:
+    """Energy per unit of distance flown."""
+
+    def __init__(self, per_unit=0.1):
+        self.per_unit = per_unit
+
+    def __call__(self, distance, hover, payload):
+        return self.per_unit * distance
+
+
+class HoverCost:
+    """Energy per slot spent holding position."""
+
+    def __init__(self, per_slot=0.0):
+        self.per_slot = per_slot
+
+    def __call__(self, distance, hover, payload):
+        return self.per_slot * hover
+
+
+class PayloadCost:
+    """Energy per MB of offloaded data received and processed."""
+
+    def __init__(self, per_mb=0.0):
+        self.per_mb = per_mb
+
+    def __call__(self, distance, hover, payload):
+        return self.per_mb * payload
+
+
+COST_TERMS = {'cruise': CruiseCost, 'hover': HoverCost, 'payload': PayloadCost}
+
+
+class EnergyModel:
+    """Sum of pluggable cost terms, evaluated element-wise over arrays of moves.
+
+    Every term is a callable term(distance, hover, payload) that is linear
+    in its inputs and broadcasts over NumPy arrays. The defaults reproduce the simple model used so far:
+    0.1 per unit flown, a flat offload_cost per task, and no hover or
+    payload charge.
+    """
+
+    def __init__(self, terms=None, offload_cost=0.5):
+        self.terms = list(terms) if terms is not None else [CruiseCost()]
+        self.offload_cost = offload_cost
+
+    @classmethod
+    def from_config(cls, config):
+        settings = config.get('energy', {})
+        terms = [COST_TERMS['cruise'](settings.get('cruise_per_unit', 0.1))]
+        if settings.get('hover_per_slot'):
+            terms.append(COST_TERMS['hover'](settings['hover_per_slot']))
+        if settings.get('payload_per_mb'):
+            terms.append(COST_TERMS['payload'](settings['payload_per_mb']))
+        return cls(terms, config.get('offloading', {}).get('offload_cost', 0.5))
+
+    def cost(self, distance=0.0, hover=0.0, payload=0.0):
+        total = 0.0
+        for term in self.terms:
+            total = total + term(distance, hover, payload)
+        return total
+
+    def move_costs(self, origins, targets):
+        """(origins x targets) matrix of flight costs between two sets of points."""
+        origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+        targets = np.asarray(targets, dtype=float).reshape(-1, 2)
+        diff = origins[:, None, :] - targets[None, :, :]
+        return self.cost(distance=np.hypot(diff[..., 0], diff[..., 1]))
+
+    def task_costs(self, data_size):
+        """Energy a UAV spends to take each offloaded task of the given sizes (MB)."""
+        data_size = np.asarray(data_size, dtype=float)
+        return np.full(data_size.shape, self.offload_cost) + self.cost(payload=data_size)
+
+    def leg_costs(self, path):
+        """Flight cost of the leg into each waypoint of a closed tour, from the waypoint before it."""
+        path = np.asarray(path, dtype=float).reshape(-1, 2)
+        legs = path - np.roll(path, 1, axis=0)
+        return self.cost(distance=np.hypot(legs[:, 0], legs[:, 1]))
+
+
+class CostTable:
+    """Flight costs from a UAV's position to a fixed set of waypoints.
+
+    The waypoints are the device positions plus the UAV start points. Patrol
+    tours and greedy targets only ever visit these points, so a move is
+    addressed by the table index of its target. Each cost is computed from
+    the two points when asked for rather than cached by row, so memory stays
+    at the waypoints themselves however many UAV positions are seen.
+    """
+
+    def __init__(self, points, model):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.model = model
+        self.index = {}
+        for i, (x, y) in enumerate(self.points.tolist()):
+            self.index.setdefault((x, y), i)
+
+    def locate(self, x, y):
+        """Table index of waypoint (x, y), or -1."""
+        return self.index.get((float(x), float(y)), -1)
+
+    def move_cost(self, x, y, targets):
+        """Flight costs from (x, y) to each table index in `targets`."""
+        diff = self.points[targets] - (x, y)
+        return self.model.cost(distance=np.hypot(diff[..., 0], diff[..., 1]))
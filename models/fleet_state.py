@@ -0,0 +1,114 @@
+# models/fleet_state.py
+import numpy as np
+
+
+class FleetState:
+    """Structure-of-arrays store for a group of entities of one kind.
+
+    Positions, energy and status flags live in NumPy columns; IoTDevice, UAV
+    and Threat objects are thin views holding (state, index) into them, so
+    whole-fleet queries run as single array operations.
+    """
+
+    def __init__(self, capacity=0):
+        self.pos = np.zeros((capacity, 2))
+        self.energy = np.zeros(capacity)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.detected = np.zeros(capacity, dtype=bool)
+        self.neutralized = np.zeros(capacity, dtype=bool)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, x, y, energy=0.0, active=True):
+        if self.size == len(self.energy):
+            self._grow(max(8, 2 * self.size))
+        index = self.size
+        self.pos[index] = (x, y)
+        self.energy[index] = energy
+        self.active[index] = active
+        self.detected[index] = False
+        self.neutralized[index] = False
+        self.size += 1
+        return index
+
+    def _grow(self, capacity):
+        for name in ('pos', 'energy', 'active', 'detected', 'neutralized'):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    @classmethod
+    def bind(cls, entities):
+        """Return one state backing `entities` in list order, moving them into it if needed."""
+        if entities:
+            state = entities[0]._state
+            if len(state) == len(entities) and all(
+                    e._state is state and e._index == i for i, e in enumerate(entities)):
+                return state
+        state = cls(len(entities))
+        for entity in entities:
+            entity._rebind(state)
+        return state
+
+    @property
+    def positions(self):
+        return self.pos[:self.size]
+
+    def distances_to(self, x, y):
+        return np.hypot(self.pos[:self.size, 0] - x, self.pos[:self.size, 1] - y)
+
+    def pairwise_distances(self, other):
+        """Distance matrix of shape (len(self), len(other))."""
+        diff = self.pos[:self.size, None, :] - other.pos[None, :other.size, :]
+        return np.hypot(diff[..., 0], diff[..., 1])
+
+    def within(self, x, y, radius):
+        dx = self.pos[:self.size, 0] - x
+        dy = self.pos[:self.size, 1] - y
+        return dx * dx + dy * dy <= radius * radius
+
+    def drain(self, mask, amount, floor=0.0):
+        energy = self.energy[:self.size]
+        energy[mask] = np.maximum(energy[mask] - amount, floor)
+
+
+class StateView:
+    """Base for entity classes whose scalar fields are views into a FleetState."""
+
+    def _attach(self, x, y, energy=0.0, active=True):
+        self._state = FleetState(1)
+        self._index = self._state.add(x, y, energy, active)
+
+    def _rebind(self, state):
+        old, i = self._state, self._index
+        self._index = state.add(old.pos[i, 0], old.pos[i, 1], old.energy[i], old.active[i])
+        state.detected[self._index] = old.detected[i]
+        state.neutralized[self._index] = old.neutralized[i]
+        self._state = state
+
+    @property
+    def x(self):
+        return self._state.pos[self._index, 0]
+
+    @x.setter
+    def x(self, value):
+        self._state.pos[self._index, 0] = value
+
+    @property
+    def y(self):
+        return self._state.pos[self._index, 1]
+
+    @y.setter
+    def y(self, value):
+        self._state.pos[self._index, 1] = value
+
+    @property
+    def energy(self):
+        return self._state.energy[self._index]
+
+    @energy.setter
+    def energy(self, value):
+        self._state.energy[self._index] = value
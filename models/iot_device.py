@@ -1,24 +1,29 @@
 # models/iot_device.py
-import numpy as np
+import math
+from models.fleet_state import StateView
 
-class IoTDevice:
+class IoTDevice(StateView):
     def __init__(self, id, x, y, battery, sensing_range):
         self.id = id
-        self.x = x
-        self.y = y
-        self.energy = battery
+        self._attach(x, y, energy=battery, active=True)
         self.sensing_range = sensing_range
-        self.active = True
 
-    def generate_task(self):
+    @property
+    def active(self):
+        return bool(self._state.active[self._index])
+
+    @active.setter
+    def active(self, value):
+        self._state.active[self._index] = value
+
+    def generate_task(self, data_size, urgency):
         return {
             'device_id': self.id,
             'position': (self.x, self.y),
-            'data_size': np.random.randint(10, 100),  # in MB
-            'urgency': np.random.choice(['low', 'medium', 'high'])
+            'data_size': int(data_size),  # in MB
+            'urgency': str(urgency)
         }
 
     def distance_to(self, x, y):
-        return np.linalg.norm(np.array([self.x, self.y]) - np.array([x, y]))
-
+        return math.hypot(self.x - x, self.y - y)
 
@@ -0,0 +1,158 @@
+# models/spatial_index.py
+import numpy as np
+
+
+class GridIndex:
+    """Uniform grid over 2-D points for range and nearest-neighbour queries.
+
+    Cells are `cell_size` wide (the UAV service range is a good choice), so a
+    radius query only inspects the handful of cells overlapping the query
+    disc. update() re-buckets just the points whose cell changed.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.positions = np.empty((0, 2))
+        self.cells = np.empty((0, 2), dtype=np.int64)
+        self.buckets = {}
+        self.lo = np.zeros(2, dtype=np.int64)
+        self.hi = np.zeros(2, dtype=np.int64)
+        self.checks = 0  # exact distance tests performed, for instrumentation
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cell_of(self, positions):
+        return np.floor(positions / self.cell_size).astype(np.int64)
+
+    def build(self, positions):
+        self.positions = np.array(positions, dtype=float).reshape(-1, 2)
+        self.cells = self._cell_of(self.positions)
+        self.buckets = {}
+        if not len(self.positions):
+            return self
+        self.lo, self.hi = self.cells.min(axis=0), self.cells.max(axis=0)
+        order = np.lexsort((self.cells[:, 1], self.cells[:, 0]))
+        sorted_cells = self.cells[order]
+        breaks = np.flatnonzero(np.any(np.diff(sorted_cells, axis=0) != 0, axis=1)) + 1
+        for group in np.split(order, breaks):
+            cx, cy = self.cells[group[0]]
+            self.buckets[(int(cx), int(cy))] = set(group.tolist())
+        return self
+
+    def update(self, indices, positions):
+        indices = np.asarray(indices, dtype=np.int64)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.positions[indices] = positions
+        new_cells = self._cell_of(positions)
+        moved = np.any(new_cells != self.cells[indices], axis=1)
+        for i, old, new in zip(indices[moved].tolist(), self.cells[indices[moved]].tolist(),
+                               new_cells[moved].tolist()):
+            bucket = self.buckets[tuple(old)]
+            bucket.discard(i)
+            if not bucket:
+                del self.buckets[tuple(old)]
+            self.buckets.setdefault(tuple(new), set()).add(i)
+        self.cells[indices] = new_cells
+        if len(new_cells):
+            self.lo = np.minimum(self.lo, new_cells.min(axis=0))
+            self.hi = np.maximum(self.hi, new_cells.max(axis=0))
+
+    def _gather(self, cx_range, cy_range):
+        found = []
+        for cx in cx_range:
+            for cy in cy_range:
+                bucket = self.buckets.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return np.array(found, dtype=np.int64)
+
+    def query_radius(self, x, y, radius):
+        """Sorted indices of points within `radius` of (x, y), boundary inclusive."""
+        lo = np.floor((np.array([x, y]) - radius) / self.cell_size).astype(np.int64)
+        hi = np.floor((np.array([x, y]) + radius) / self.cell_size).astype(np.int64)
+        candidates = self._gather(range(lo[0], hi[0] + 1), range(lo[1], hi[1] + 1))
+        if not candidates.size:
+            return candidates
+        self.checks += candidates.size
+        diff = self.positions[candidates] - (x, y)
+        hits = candidates[np.einsum('ij,ij->i', diff, diff) <= radius * radius]
+        hits.sort()
+        return hits
+
+    def nearest(self, x, y):
+        """Index of the closest point (lowest index on ties), or -1 if empty."""
+        if not len(self.positions):
+            return -1
+        cx, cy = self._cell_of(np.array([x, y], dtype=float))
+        max_ring = int(max(abs(cx - self.lo[0]), abs(cx - self.hi[0]),
+                           abs(cy - self.lo[1]), abs(cy - self.hi[1])))
+        best, best_d2 = -1, np.inf
+        for ring in range(max_ring + 1):
+            if ring == 0:
+                candidates = self._gather([cx], [cy])
+            else:
+                xs = range(cx - ring, cx + ring + 1)
+                candidates = np.concatenate([
+                    self._gather(xs, [cy - ring, cy + ring]),
+                    self._gather([cx - ring, cx + ring], range(cy - ring + 1, cy + ring)),
+                ])
+            if candidates.size:
+                self.checks += candidates.size
+                diff = self.positions[candidates] - (x, y)
+                d2 = np.einsum('ij,ij->i', diff, diff)
+                pick = np.lexsort((candidates, d2))[0]
+                if (d2[pick], candidates[pick]) < (best_d2, best):
+                    best, best_d2 = int(candidates[pick]), d2[pick]
+            # Anything in a ring further out is at least ring * cell_size away
+            if best >= 0 and best_d2 <= (ring * self.cell_size) ** 2:
+                break
+        return best
+
+
+class KDTreeIndex:
+    """scipy cKDTree behind the same interface; rebuilt lazily after updates."""
+
+    def __init__(self, cell_size=None):
+        self.positions = np.empty((0, 2))
+        self.tree = None
+        self.checks = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def build(self, positions):
+        self.positions = np.array(positions, dtype=float).reshape(-1, 2)
+        self.tree = None
+        return self
+
+    def update(self, indices, positions):
+        self.positions[np.asarray(indices, dtype=np.int64)] = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.tree = None
+
+    def _tree(self):
+        if self.tree is None:
+            from scipy.spatial import cKDTree
+            self.tree = cKDTree(self.positions)
+        return self.tree
+
+    def query_radius(self, x, y, radius):
+        if not len(self.positions):
+            return np.empty(0, dtype=np.int64)
+        hits = np.array(sorted(self._tree().query_ball_point((x, y), radius)), dtype=np.int64)
+        self.checks += hits.size
+        return hits
+
+    def nearest(self, x, y):
+        if not len(self.positions):
+            return -1
+        self.checks += 1
+        return int(self._tree().query((x, y))[1])
+
+
+def make_spatial_index(kind, cell_size):
+    if kind == 'grid':
+        return GridIndex(cell_size)
+    if kind == 'kdtree':
+        return KDTreeIndex(cell_size)
+    raise ValueError(f"Unknown spatial index '{kind}' (expected 'grid' or 'kdtree')")
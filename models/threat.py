@@ -1,20 +1,35 @@
 # models/threat.py
-import numpy as np
+import math
+from models.fleet_state import StateView
 
-class Threat:
+class Threat(StateView):
     def __init__(self, id, x, y):
         self.id = id
-        self.x = x
-        self.y = y
-        self.detected = False
-        self.neutralized = False
+        self._attach(x, y)
+
+    @property
+    def detected(self):
+        return bool(self._state.detected[self._index])
+
+    @detected.setter
+    def detected(self, value):
+        self._state.detected[self._index] = value
+
+    @property
+    def neutralized(self):
+        return bool(self._state.neutralized[self._index])
+
+    @neutralized.setter
+    def neutralized(self, value):
+        self._state.neutralized[self._index] = value
 
     @staticmethod
-    def generate_random(area_size, count):
-        return [Threat(i, np.random.randint(0, area_size), np.random.randint(0, area_size)) for i in range(count)]
+    def generate_random(area_size, count, rng):
+        x, y = rng.integers(0, area_size, size=(2, count))
+        return [Threat(i, int(x[i]), int(y[i])) for i in range(count)]
 
     def position(self):
         return (self.x, self.y)
 
     def is_near(self, x, y, radius):
-        return np.linalg.norm(np.array([self.x, self.y]) - np.array([x, y])) <= radius
\ No newline at end of file
+        return math.hypot(self.x - x, self.y - y) <= radius
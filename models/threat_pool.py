@@ -0,0 +1,137 @@
+# models/threat_pool.py
+import numpy as np
+from models.fleet_state import FleetState
+from models.threat import Threat
+
+# Slots a threat is expected to stay pooled: entry bands are 10-20 units out and threats close 1-3 units a slot
+TRANSIT_SLOTS = 10
+
+
+def entry_positions(area_size, n, rng):
+    """Entry points for `n` intruders in the bands 10-20 units above or below the border."""
+    middle = area_size // 2
+    bottom = rng.random(n) < 0.5
+    x = rng.integers(0, area_size, size=n)
+    y = np.where(bottom,
+                 rng.integers(middle - 20, middle - 10, size=n),
+                 rng.integers(middle + 10, middle + 20, size=n))
+    return np.column_stack([x, y]).astype(float)
+
+
+class ThreatPool:
+    """Pool of threats backed by one FleetState.
+
+    `capacity` slots are allocated up front; the state's `active` column
+    marks which slots hold a live intruder. spawn() pops slots off a free
+    list and retire() pushes them back, so sustained incursions reuse the
+    same arrays instead of reallocating. When the free list runs out the
+    pool doubles, as FleetState.add does; a pool built with
+    `growable=False` instead drops the excess spawns and counts them in
+    `dropped`.
+    """
+
+    def __init__(self, capacity, area_size, growable=True):
+        self.capacity = max(0, int(capacity))
+        self.area_size = area_size
+        self.growable = growable
+        self.state = FleetState(self.capacity)
+        self.state.size = self.capacity
+        self.state.active[:] = False
+        self.ids = np.full(self.capacity, -1, dtype=np.int64)
+        # Stack of free slots; the top is at free[free_count - 1]
+        self.free = np.arange(self.capacity, dtype=np.int64)[::-1].copy()
+        self.free_count = self.capacity
+        self.next_id = 0
+        self.spawned = 0
+        self.retired = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.capacity - self.free_count
+
+    @property
+    def alive(self):
+        return self.state.active[:self.capacity]
+
+    @property
+    def live(self):
+        """Mask of threats that are in play: spawned and not yet neutralized."""
+        return self.state.active[:self.capacity] & ~self.state.neutralized[:self.capacity]
+
+    def sample_positions(self, n, rng):
+        return entry_positions(self.area_size, n, rng)
+
+    def spawn(self, positions):
+        """Place new threats at `positions`; returns the pool slots they were given."""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        if self.growable and len(positions) > self.free_count:
+            self._grow(max(8, 2 * self.capacity, self.capacity + len(positions) - self.free_count))
+        n = min(len(positions), self.free_count)
+        self.dropped += len(positions) - n
+        slots = self.free[self.free_count - n:self.free_count][::-1].copy()
+        self.free_count -= n
+        state = self.state
+        state.pos[slots] = positions[:n]
+        state.active[slots] = True
+        state.detected[slots] = False
+        state.neutralized[slots] = False
+        self.ids[slots] = np.arange(self.next_id, self.next_id + n)
+        self.next_id += n
+        self.spawned += n
+        return slots
+
+    def _grow(self, capacity):
+        """Extend the pool to `capacity` slots; the new ones are handed out after the current free slots, lowest first."""
+        added = np.arange(self.capacity, capacity, dtype=np.int64)
+        self.state._grow(capacity)
+        self.state.size = capacity
+        self.ids = np.concatenate([self.ids, np.full(len(added), -1, dtype=np.int64)])
+        free = np.empty(capacity, dtype=np.int64)
+        free[:len(added)] = added[::-1]
+        free[len(added):len(added) + self.free_count] = self.free[:self.free_count]
+        self.free = free
+        self.free_count += len(added)
+        self.capacity = capacity
+
+    def retire(self, mask):
+        """Return the live slots selected by `mask` to the free list; returns how many."""
+        slots = np.flatnonzero(mask & self.alive)
+        n = len(slots)
+        self.state.active[slots] = False
+        self.free[self.free_count:self.free_count + n] = slots[::-1]
+        self.free_count += n
+        self.retired += n
+        return n
+
+    def step(self, rng):
+        """Move every live threat one slot: 1-3 units toward the border and -2..2 sideways."""
+        slots = np.flatnonzero(self.live)
+        if not len(slots):
+            return
+        pos = self.state.pos
+        direction = np.where(pos[slots, 1] > self.area_size // 2, -1, 1)
+        dy = rng.integers(1, 4, size=len(slots))
+        dx = rng.integers(-2, 3, size=len(slots))
+        pos[slots, 1] = np.clip(pos[slots, 1] + direction * dy, 0, self.area_size - 1)
+        pos[slots, 0] = np.clip(pos[slots, 0] + dx, 0, self.area_size - 1)
+
+    def views(self):
+        """Threat objects for the live-or-neutralized slots, as views into the pool."""
+        threats = []
+        for slot in np.flatnonzero(self.alive).tolist():
+            threat = Threat.__new__(Threat)
+            threat.id = int(self.ids[slot])
+            threat._state = self.state
+            threat._index = slot
+            threats.append(threat)
+        return threats
+
+    @staticmethod
+    def default_capacity(count, spawn_rate, time_slots):
+        """Expected steady-state live count: initial threats plus one transit's spawns, with a four-sigma margin.
+
+        Neutralized threats are retired and their slots reused, so the pool
+        only has to hold what is in play at once; it grows if that is not enough.
+        """
+        expected = spawn_rate * min(time_slots, TRANSIT_SLOTS)
+        return int(count + np.ceil(expected + 4 * np.sqrt(expected)))
@@ -1,21 +1,21 @@
 # models/uav_node.py
-import numpy as np
+import math
+from models.fleet_state import StateView
 
-class UAV:
+class UAV(StateView):
     def __init__(self, id, x, y, battery, hover_time):
         self.id = id
-        self.x = x
-        self.y = y
-        self.energy = battery
+        self._attach(x, y, energy=battery)
         self.hover_time = hover_time
         self.assigned_task = None
 
-    def move_to(self, target_x, target_y):
-        distance = np.linalg.norm(np.array([self.x, self.y]) - np.array([target_x, target_y]))
+    def move_to(self, target_x, target_y, cost=None):
+        """Fly to the target, charging `cost` (e.g. from a CostTable) or 0.1 per unit flown."""
+        distance = math.hypot(self.x - target_x, self.y - target_y)
         self.x = target_x
         self.y = target_y
-        self.energy -= distance * 0.1  # simple movement cost model
+        self.energy -= distance * 0.1 if cost is None else cost  # simple movement cost model
         return distance
 
     def can_reach(self, device, service_range):
-        return device.distance_to(self.x, self.y) <= service_range
\ No newline at end of file
+        return device.distance_to(self.x, self.y) <= service_range
@@ -0,0 +1,228 @@
+# mpc/batched_predictor.py
+import numpy as np
+
+
+class BatchedGMMPredictor:
+    """Vectorized 1-D Gaussian mixture EM over every device history at once.
+
+    Drop-in replacement for GMMPredictor: histories are stacked into a
+    (devices x window) array and one EM loop fits all of them together.
+    The forecast is the mixture mean sum_k w_k * mu_k which, after any
+    M-step, equals the window mean, so predict() matches the sklearn path.
+
+    With incremental=True the previous slot's mixture is kept together with
+    per-component sufficient statistics of the window. Each slot then only
+    adds the entering sample and removes the evicted one; a device is refit
+    (warm-started from its current parameters) only when the new sample sits
+    more than drift_z standard deviations from every component.
+    """
+
+    def __init__(self, n_components=2, max_iter=100, tol=1e-3, reg_covar=1e-6,
+                 incremental=False, drift_z=3.0):
+        self.n_components = n_components
+        self.max_iter = max_iter
+        self.tol = tol
+        self.reg_covar = reg_covar
+        self.incremental = incremental
+        self.drift_z = drift_z
+        self.index = {}
+        self.weights = np.empty((0, n_components))
+        self.means = np.empty((0, n_components))
+        self.variances = np.empty((0, n_components))
+        self.trained = np.zeros(0, dtype=bool)
+        # Incremental state: window samples and their responsibilities in a
+        # per-device ring, plus the summed statistics [sum r, sum r*x, sum r*x^2].
+        self.stats = np.zeros((0, 3, n_components))
+        self.ring_x = np.zeros((0, 0))
+        self.ring_resp = np.zeros((0, 0, n_components))
+        self.head = np.zeros(0, dtype=int)
+        self.count = np.zeros(0, dtype=int)
+        self.refits = 0
+
+    def train(self, device_id, energy_history):
+        self.train_batch([device_id], np.asarray(energy_history, dtype=float).reshape(1, -1))
+
+    def train_batch(self, device_ids, histories):
+        histories = np.asarray(histories, dtype=float)
+        if histories.ndim != 2 or histories.shape[1] < self.n_components:
+            return
+        rows = self._rows_for(device_ids)
+        if self.incremental:
+            self._train_incremental(rows, histories)
+            return
+        weights, means, variances = self._init_params(histories)
+        weights, means, variances = self._em(histories, weights, means, variances)
+        self.weights[rows] = weights
+        self.means[rows] = means
+        self.variances[rows] = variances
+        self.trained[rows] = True
+
+    def predict(self, device_id):
+        row = self.index.get(device_id)
+        if row is None or not self.trained[row]:
+            return 1.0  # Default fallback
+        mean = np.dot(self.weights[row], self.means[row])
+        return max(mean, 0.1)  # Ensure positive prediction
+
+    def predict_batch(self, device_ids):
+        rows = np.array([self.index.get(i, -1) for i in device_ids], dtype=int)
+        out = np.ones(len(rows))
+        known = rows >= 0
+        known[known] = self.trained[rows[known]]
+        mean = np.einsum('ij,ij->i', self.weights[rows[known]], self.means[rows[known]])
+        out[known] = np.maximum(mean, 0.1)
+        return out
+
+    def _rows_for(self, device_ids):
+        new = [i for i in device_ids if i not in self.index]
+        if new:
+            start = len(self.index)
+            for offset, device_id in enumerate(new):
+                self.index[device_id] = start + offset
+            grow = len(new)
+            k = self.n_components
+            self.weights = np.vstack([self.weights, np.full((grow, k), 1.0 / k)])
+            self.means = np.vstack([self.means, np.zeros((grow, k))])
+            self.variances = np.vstack([self.variances, np.ones((grow, k))])
+            self.trained = np.concatenate([self.trained, np.zeros(grow, dtype=bool)])
+            self.stats = np.concatenate([self.stats, np.zeros((grow, 3, k))])
+            self.ring_x = np.vstack([self.ring_x, np.zeros((grow, self.ring_x.shape[1]))])
+            self.ring_resp = np.concatenate(
+                [self.ring_resp, np.zeros((grow,) + self.ring_resp.shape[1:])])
+            self.head = np.concatenate([self.head, np.zeros(grow, dtype=int)])
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=int)])
+        return np.array([self.index[i] for i in device_ids], dtype=int)
+
+    def _train_incremental(self, rows, X):
+        n = X.shape[1]
+        if self.ring_x.shape[1] < n:
+            self._grow_ring(n)
+        cap = self.ring_x.shape[1]
+        trained = self.trained[rows]
+        count = self.count[rows]
+        last = self.ring_x[rows, (self.head[rows] + count - 1) % cap]
+        # Only a window that advanced by exactly one sample can be updated in place
+        sliding = trained & ((count == n) | (count == n - 1))
+        if n > 1:
+            sliding &= last == X[:, -2]
+
+        x_new = X[:, -1]
+        if sliding.any():
+            sub = rows[sliding]
+            resp, z = self._responsibilities(x_new[sliding], sub)
+            ok = z <= self.drift_z
+            self._slide(sub[ok], x_new[sliding][ok], resp[ok], count[sliding][ok] == n)
+            sliding[np.flatnonzero(sliding)[~ok]] = False
+
+        refit = ~sliding
+        if refit.any():
+            self._refit(rows[refit], X[refit], trained[refit])
+
+    def _responsibilities(self, x, rows):
+        log_prob = self._log_prob(x[:, None], self.weights[rows], self.means[rows], self.variances[rows])[:, 0, :]
+        resp = np.exp(log_prob - log_prob.max(axis=1, keepdims=True))
+        resp /= resp.sum(axis=1, keepdims=True)
+        z = np.min(np.abs(x[:, None] - self.means[rows]) / np.sqrt(self.variances[rows]), axis=1)
+        return resp, z
+
+    def _slide(self, rows, x_new, resp_new, evict):
+        cap = self.ring_x.shape[1]
+        out = rows[evict]
+        if out.size:
+            head = self.head[out]
+            x_old = self.ring_x[out, head]
+            r_old = self.ring_resp[out, head]
+            self.stats[out] -= self._sample_stats(x_old, r_old)
+            self.head[out] = (head + 1) % cap
+            self.count[out] -= 1
+        slot = (self.head[rows] + self.count[rows]) % cap
+        self.ring_x[rows, slot] = x_new
+        self.ring_resp[rows, slot] = resp_new
+        self.count[rows] += 1
+        self.stats[rows] += self._sample_stats(x_new, resp_new)
+        self._params_from_stats(rows)
+
+    def _refit(self, rows, X, warm):
+        weights, means, variances = self._init_params(X)
+        weights[warm] = self.weights[rows[warm]]
+        means[warm] = self.means[rows[warm]]
+        variances[warm] = self.variances[rows[warm]]
+        weights, means, variances = self._em(X, weights, means, variances)
+        resp, _ = self._e_step(X, weights, means, variances)
+
+        n = X.shape[1]
+        self.ring_x[rows, :n] = X
+        self.ring_resp[rows, :n] = resp
+        self.head[rows] = 0
+        self.count[rows] = n
+        self.stats[rows] = np.stack([resp.sum(axis=1),
+                                     np.einsum('dnk,dn->dk', resp, X),
+                                     np.einsum('dnk,dn->dk', resp, X ** 2)], axis=1)
+        self._params_from_stats(rows)
+        self.trained[rows] = True
+        self.refits += len(rows)
+
+    def _grow_ring(self, cap):
+        old_cap = self.ring_x.shape[1]
+        order = (self.head[:, None] + np.arange(old_cap)) % max(old_cap, 1)
+        ring_x = np.zeros((len(self.head), cap))
+        ring_resp = np.zeros((len(self.head), cap, self.n_components))
+        if old_cap:
+            ring_x[:, :old_cap] = np.take_along_axis(self.ring_x, order, axis=1)
+            ring_resp[:, :old_cap] = np.take_along_axis(self.ring_resp, order[:, :, None], axis=1)
+        self.ring_x, self.ring_resp = ring_x, ring_resp
+        self.head[:] = 0
+
+    def _sample_stats(self, x, resp):
+        return np.stack([resp, resp * x[:, None], resp * (x ** 2)[:, None]], axis=1)
+
+    def _params_from_stats(self, rows):
+        s0, s1, s2 = self.stats[rows, 0], self.stats[rows, 1], self.stats[rows, 2]
+        nk = s0 + 10 * np.finfo(float).eps
+        means = s1 / nk
+        self.means[rows] = means
+        self.variances[rows] = np.maximum(s2 / nk - means ** 2, 0.0) + self.reg_covar
+        self.weights[rows] = nk / self.count[rows][:, None]
+
+    def _init_params(self, X):
+        # Quantile seeding stands in for k-means: deterministic and batchable.
+        k = self.n_components
+        n_devices = X.shape[0]
+        quantiles = (np.arange(k) + 0.5) / k
+        means = np.quantile(X, quantiles, axis=1).T
+        variances = np.repeat(X.var(axis=1, keepdims=True), k, axis=1) + self.reg_covar
+        weights = np.full((n_devices, k), 1.0 / k)
+        return weights, means, variances
+
+    def _log_prob(self, X, weights, means, variances):
+        diff = X[:, :, None] - means[:, None, :]
+        return (np.log(weights)[:, None, :]
+                - 0.5 * (np.log(2 * np.pi * variances)[:, None, :] + diff ** 2 / variances[:, None, :]))
+
+    def _e_step(self, X, weights, means, variances):
+        log_prob = self._log_prob(X, weights, means, variances)
+        peak = log_prob.max(axis=2, keepdims=True)
+        log_norm = peak + np.log(np.exp(log_prob - peak).sum(axis=2, keepdims=True))
+        resp = np.exp(log_prob - log_norm)
+        return resp, log_norm[:, :, 0].mean(axis=1)
+
+    def _m_step(self, X, resp):
+        nk = resp.sum(axis=1) + 10 * np.finfo(float).eps
+        means = np.einsum('dnk,dn->dk', resp, X) / nk
+        diff = X[:, :, None] - means[:, None, :]
+        variances = np.einsum('dnk,dnk->dk', resp, diff ** 2) / nk + self.reg_covar
+        weights = nk / X.shape[1]
+        return weights, means, variances
+
+    def _em(self, X, weights, means, variances):
+        lower_bound = np.full(X.shape[0], -np.inf)
+        active = np.arange(X.shape[0])
+        for _ in range(self.max_iter):
+            if active.size == 0:
+                break
+            resp, new_bound = self._e_step(X[active], weights[active], means[active], variances[active])
+            weights[active], means[active], variances[active] = self._m_step(X[active], resp)
+            converged = np.abs(new_bound - lower_bound[active]) < self.tol
+            lower_bound[active] = new_bound
+            active = active[~converged]
+        return weights, means, variances
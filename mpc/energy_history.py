@@ -0,0 +1,38 @@
+# mpc/energy_history.py
+import numpy as np
+
+
+class EnergyHistory:
+    """Fixed (devices x window) ring buffer of per-slot energy samples.
+
+    Every sample is written twice, at column c and c + window, of a
+    (devices x 2*window) array. The most recent `window` samples are then
+    always one contiguous column range, so window() returns a chronological
+    zero-copy view. A push costs one column write whatever the window length.
+    """
+
+    def __init__(self, n_devices, window):
+        self.window_size = max(1, int(window))
+        self.buffer = np.zeros((n_devices, 2 * self.window_size))
+        self.cursor = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, values):
+        """Append one sample per device; returns the column it evicted, or None while filling."""
+        evicted = self.buffer[:, self.cursor].copy() if self.count == self.window_size else None
+        self.buffer[:, self.cursor] = values
+        self.buffer[:, self.cursor + self.window_size] = values
+        self.cursor = (self.cursor + 1) % self.window_size
+        self.count = min(self.count + 1, self.window_size)
+        return evicted
+
+    def window(self):
+        """(devices x count) view of the retained samples, oldest first."""
+        end = self.cursor + self.window_size
+        return self.buffer[:, end - self.count:end]
+
+    def latest(self):
+        return self.buffer[:, self.cursor + self.window_size - 1]
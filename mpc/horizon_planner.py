@@ -0,0 +1,178 @@
+# mpc/horizon_planner.py
+import time
+from collections import deque
+
+import numpy as np
+from models.energy_model import EnergyModel
+from simulation.rng import RNGService
+
+# Solves kept for the latency percentile; mean, max and over-budget counts cover every solve
+LATENCY_WINDOW = 1000
+
+
+class HorizonPlanner:
+    """N-step receding-horizon planner for UAV waypoints.
+
+    Each solve samples candidate trajectories (random walks over a pool of
+    device and predicted threat positions, plus the warm start, the greedy
+    nearest-device choice and hovering in place) and scores all of them as
+    one (candidates x horizon x targets) tensor: forecast device energy and
+    threats covered within service range, discounted per step, minus the
+    flight energy. Only the first waypoint is executed; the rest of the best
+    trajectory seeds the next slot. Candidates are evaluated in chunks until
+    the UAV's share of the per-slot compute budget runs out. Each UAV gets
+    an equal share of what is left when its turn comes, so an expensive
+    first UAV cannot starve the rest.
+
+    Random walks for UAV j in solve n come from the RNGService `rng`
+    stream ('planner', n, j), so they depend on the run seed only, never on
+    how many candidates earlier solves or UAVs got through in time. With
+    a budget that covers every candidate, plans are fully deterministic.
+    """
+
+    def __init__(self, config, rng=None):
+        mpc = config.get('mpc', {})
+        self.horizon = mpc.get('horizon', 3)
+        self.candidates = mpc.get('candidates', 64)
+        self.chunk = mpc.get('chunk', 16)
+        self.budget_ms = mpc.get('budget_ms', 20.0)
+        self.discount = mpc.get('discount', 0.9)
+        self.threat_weight = mpc.get('threat_weight', 5.0)
+        self.pool_size = mpc.get('pool_size', 256)
+        self.neighbours = mpc.get('neighbours', 8)
+        self.energy_model = EnergyModel.from_config(config)
+        self.service_range = config['uav']['service_range']
+        self.area_size = config['area_size']
+        self.rng = rng if rng is not None else RNGService(config.get('experiments', {}).get('seed', 0))
+        self.solves = 0
+        self.previous = {}
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.over_budget = 0
+        self.recent_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def predict_threats(self, threat_positions):
+        """(horizon, T, 2) expected threat positions: each step drifts 2 units toward the border."""
+        if not len(threat_positions):
+            return np.empty((self.horizon, 0, 2))
+        middle = self.area_size // 2
+        direction = np.where(threat_positions[:, 1] > middle, -1.0, 1.0)
+        steps = np.arange(1, self.horizon + 1)[:, None]
+        future = np.repeat(threat_positions[None, :, :], self.horizon, axis=0).astype(float)
+        future[:, :, 1] = np.clip(threat_positions[None, :, 1] + 2.0 * steps * direction, 0, self.area_size - 1)
+        return future
+
+    def plan(self, uavs, device_positions, forecasts, threat_positions):
+        """Return {uav_id: (x, y)} for the next slot and remember the tail of each plan."""
+        start = time.perf_counter()
+        device_positions = np.asarray(device_positions, dtype=float).reshape(-1, 2)
+        value = np.asarray(forecasts, dtype=float).copy()
+        threats = self.predict_threats(np.asarray(threat_positions, dtype=float).reshape(-1, 2))
+        threat_alive = np.ones(threats.shape[1], dtype=bool)
+
+        pool = self._pool(device_positions, value, threats)
+        knn = self._knn(pool)
+        deadline = start + self.budget_ms / 1000.0
+        plans = {}
+        for turn, uav in enumerate(uavs):
+            now = time.perf_counter()
+            uav_deadline = now + max(deadline - now, 0.0) / (len(uavs) - turn)
+            rng = self.rng.stream('planner', self.solves, uav.id)
+            origin = np.array([uav.x, uav.y], dtype=float)
+            best_traj, best_score = None, -np.inf
+            for batch in self._candidate_batches(uav.id, origin, pool, knn, device_positions, value, rng):
+                scores = self._score(origin, batch, device_positions, value, threats, threat_alive)
+                pick = int(np.argmax(scores))
+                if scores[pick] > best_score:
+                    best_traj, best_score = batch[pick], scores[pick]
+                if time.perf_counter() > uav_deadline:
+                    break
+            plans[uav.id] = (best_traj[0, 0], best_traj[0, 1])
+            self.previous[uav.id] = best_traj
+            # Later UAVs should not count targets this one already covers
+            covered = self._coverage(best_traj[None], device_positions)[0].any(axis=0)
+            value[covered] = 0.0
+            threat_alive &= ~self._threat_coverage(best_traj[None], threats)[0].any(axis=0)
+
+        self.solves += 1
+        self.last_ms = (time.perf_counter() - start) * 1000.0
+        self.total_ms += self.last_ms
+        self.max_ms = max(self.max_ms, self.last_ms)
+        self.over_budget += self.last_ms > self.budget_ms
+        self.recent_ms.append(self.last_ms)
+        return plans
+
+    def latency_stats(self):
+        """Solve latency over the run; p95 is over the last LATENCY_WINDOW solves."""
+        if not self.solves:
+            return {'solves': 0}
+        return {
+            'solves': self.solves,
+            'mean_ms': self.total_ms / self.solves,
+            'p95_ms': float(np.percentile(self.recent_ms, 95)),
+            'max_ms': self.max_ms,
+            'over_budget': self.over_budget,
+        }
+
+    def _pool(self, device_positions, value, threats):
+        points = device_positions[value > 0]
+        if len(points) > self.pool_size:
+            points = device_positions[np.argsort(-value, kind='stable')[:self.pool_size]]
+        return np.vstack([points, threats.reshape(-1, 2)]) if threats.size else points
+
+    def _knn(self, pool):
+        if len(pool) < 2:
+            return np.zeros((len(pool), 1), dtype=int)
+        diff = pool[:, None, :] - pool[None, :, :]
+        d2 = np.einsum('ijk,ijk->ij', diff, diff)
+        k = min(self.neighbours, len(pool) - 1)
+        return np.argpartition(d2, k, axis=1)[:, :k + 1]
+
+    def _candidate_batches(self, uav_id, origin, pool, knn, device_positions, value, rng):
+        fixed = [np.repeat(origin[None], self.horizon, axis=0)]
+        previous = self.previous.get(uav_id)
+        if previous is not None:
+            fixed.append(np.vstack([previous[1:], previous[-1:]]))
+        if value.any():
+            live = np.flatnonzero(value > 0)
+            diff = device_positions[live] - origin
+            nearest = device_positions[live[np.argmin(np.einsum('ij,ij->i', diff, diff))]]
+            fixed.append(np.repeat(nearest[None], self.horizon, axis=0))
+        yield np.stack(fixed)
+
+        if not len(pool):
+            return
+        diff = pool - origin
+        start = int(np.argmin(np.einsum('ij,ij->i', diff, diff)))
+        remaining = self.candidates
+        while remaining > 0:
+            size = min(self.chunk, remaining)
+            remaining -= size
+            current = np.full(size, start)
+            steps = []
+            for _ in range(self.horizon):
+                current = knn[current, rng.integers(0, knn.shape[1], size)]
+                steps.append(pool[current])
+            yield np.stack(steps, axis=1)
+
+    def _coverage(self, trajectories, device_positions):
+        diff = trajectories[:, :, None, :] - device_positions[None, None, :, :]
+        return np.einsum('chnk,chnk->chn', diff, diff) <= self.service_range ** 2
+
+    def _threat_coverage(self, trajectories, threats):
+        diff = trajectories[:, :, None, :] - threats[None, :, :, :]
+        return np.einsum('chtk,chtk->cht', diff, diff) <= self.service_range ** 2
+
+    def _score(self, origin, trajectories, device_positions, value, threats, threat_alive):
+        discount = self.discount ** np.arange(self.horizon)
+        served = self._coverage(trajectories, device_positions) @ value
+        # A threat only scores at the first step that reaches it
+        reached = self._threat_coverage(trajectories, threats) & threat_alive
+        earlier = np.logical_or.accumulate(reached, axis=1)
+        caught = (reached[:, 1:] & ~earlier[:, :-1]).sum(axis=2)
+        caught = np.concatenate([reached[:, :1].sum(axis=2), caught], axis=1)
+        path = np.concatenate([np.repeat(origin[None, None], len(trajectories), axis=0), trajectories], axis=1)
+        flight = np.linalg.norm(np.diff(path, axis=1), axis=2)
+        energy = self.energy_model.cost(distance=flight, hover=1)
+        return ((served + self.threat_weight * caught - energy) * discount).sum(axis=1)
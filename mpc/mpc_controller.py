@@ -1,37 +1,74 @@
 # mpc/mpc_controller.py
 import numpy as np
-from collections import defaultdict
+from models.fleet_state import FleetState
+from models.energy_model import CostTable, EnergyModel
+from mpc.energy_history import EnergyHistory
+from models.spatial_index import make_spatial_index
+from mpc.horizon_planner import HorizonPlanner
+from simulation.scenario import Scenario
 
 class MPCController:
-    def __init__(self, devices, uavs, config, gmm):
+    def __init__(self, devices, uavs, config, gmm, scenario=None, rng=None):
         self.devices = devices
         self.uavs = uavs
         self.config = config
+        self.scenario = scenario or Scenario.from_config(config)
         self.gmm = gmm
-        self.history = defaultdict(list)
+        self.history = EnergyHistory(len(devices), self.scenario.gmm.history_window)
+        self.index_kind = config.get('spatial', {}).get('index', 'grid')
+        self.device_ids = [d.id for d in devices]
+        self.device_state = FleetState.bind(devices)
+        # Flight costs between device waypoints and UAV starts, looked up rather than recomputed
+        self.energy_model = EnergyModel.from_config(config)
+        waypoints = np.array([(d.x, d.y) for d in devices] + [(u.x, u.y) for u in uavs], dtype=float)
+        self.cost_table = CostTable(waypoints, self.energy_model)
+        self.hover_cost = float(self.energy_model.cost(hover=1))
+        self.planner = None
+        if config.get('mpc', {}).get('planner', 'greedy') == 'horizon':
+            self.planner = HorizonPlanner(config, rng)
 
     def update_energy_history(self, actual_data):
-        for device in self.devices:
-            self.history[device.id].append(actual_data[device.id])
-            if len(self.history[device.id]) > self.config['gmm']['history_window']:
-                self.history[device.id].pop(0)
-            self.gmm.train(device.id, self.history[device.id])
+        """Record one slot of energy samples (a {device id: value} dict or an array in device order)."""
+        if isinstance(actual_data, dict):
+            actual_data = np.fromiter((actual_data[i] for i in self.device_ids), dtype=float,
+                                      count=len(self.device_ids))
+        self.history.push(actual_data)
+        self.gmm.train_batch(self.device_ids, self.history.window())
 
-    def optimize(self):
-        active_devices = [d for d in self.devices if self.gmm.predict(d.id) > self.config['offloading']['energy_threshold']]
+    def optimize(self, threat_positions=None):
+        forecasts = self.gmm.predict_batch(self.device_ids)
+        threshold = self.scenario.offloading.energy_threshold
+        active = np.flatnonzero(forecasts > threshold)
+        active_devices = [self.devices[i] for i in active]
 
         assignments = {}
+        if not active_devices and self.planner is None:
+            return assignments, active_devices
+        positions = self.device_state.positions[active]
+        service_range = self.scenario.uav.service_range
+        consumption = self.scenario.offloading.consumption_per_slot
+        index = make_spatial_index(self.index_kind, service_range).build(positions)
+        if self.planner is not None:
+            if threat_positions is None:
+                threat_positions = np.empty((0, 2))
+            targets = self.planner.plan(self.uavs, positions, forecasts[active], threat_positions)
         for uav in self.uavs:
-            if not active_devices:
-                break
-            best_device = min(active_devices, key=lambda d: d.distance_to(uav.x, uav.y))
-            uav.move_to(best_device.x, best_device.y)
-            assignments[uav.id] = (best_device.x, best_device.y)
+            if self.planner is not None:
+                best_x, best_y = targets[uav.id]
+                target = self.cost_table.locate(best_x, best_y)
+            else:
+                nearest = index.nearest(uav.x, uav.y)
+                target = active[nearest]
+                best_x, best_y = positions[nearest]
+            if target >= 0:
+                flight = float(self.cost_table.move_cost(uav.x, uav.y, target))
+            else:
+                flight = float(self.energy_model.cost(distance=np.hypot(uav.x - best_x, uav.y - best_y)))
+            uav.move_to(best_x, best_y, cost=flight + self.hover_cost)
+            assignments[uav.id] = (best_x, best_y)
 
             # Service devices within range
-            for d in active_devices:
-                if uav.can_reach(d, self.config['uav']['service_range']):
-                    d.energy -= self.config['offloading']['consumption_per_slot']
-                    d.energy = max(0, d.energy)
+            in_range = index.query_radius(best_x, best_y, service_range)
+            self.device_state.drain(active[in_range], consumption)
 
-        return assignments, active_devices
\ No newline at end of file
+        return assignments, active_devices
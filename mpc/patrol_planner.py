@@ -0,0 +1,230 @@
+# mpc/patrol_planner.py
+import hashlib
+import os
+import numpy as np
+
+# Bump when the planning algorithm changes so cached tours are not reused
+PLANNER_VERSION = 2
+
+
+def balanced_partition(positions, parts):
+    """Split point indices into `parts` groups of near-equal size by recursive bisection.
+
+    Each split cuts along the wider axis of the current group, at the count
+    quantile matching how many parts go to each side, so groups stay
+    spatially compact and their sizes differ by at most one.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+
+    def split(idx, k):
+        if k == 1:
+            return [idx]
+        pts = positions[idx]
+        axis = int(np.argmax(np.ptp(pts, axis=0))) if len(idx) else 0
+        order = idx[np.lexsort((pts[:, 1 - axis], pts[:, axis]))]
+        left = k // 2
+        cut = int(round(len(idx) * left / k))
+        return split(order[:cut], left) + split(order[cut:], k - left)
+
+    return split(np.arange(len(positions)), max(1, parts))
+
+
+def tour_length(points):
+    """Length of the closed tour visiting `points` in order."""
+    if len(points) < 2:
+        return 0.0
+    return float(np.hypot(*(points - np.roll(points, -1, axis=0)).T).sum())
+
+
+def nearest_neighbour_tour(points, start=0):
+    n = len(points)
+    order = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for k in range(n):
+        order[k] = current
+        visited[current] = True
+        if k == n - 1:
+            break
+        d2 = ((points - points[current]) ** 2).sum(axis=1)
+        d2[visited] = np.inf
+        current = int(np.argmin(d2))
+    return order
+
+
+def two_opt(points, order, eps=1e-9):
+    """One first-improvement 2-opt pass over a closed tour; returns (order, improved)."""
+    n = len(order)
+    improved = False
+    q = points[order]
+    nxt = np.roll(q, -1, axis=0)
+    edge = np.hypot(*(q - nxt).T)
+    for i in range(n - 2):
+        j = np.arange(i + 2, n if i > 0 else n - 1)
+        if not len(j):
+            continue
+        # Replace edges (i, i+1) and (j, j+1) by (i, j) and (i+1, j+1)
+        delta = (np.hypot(*(q[j] - q[i]).T) + np.hypot(*(nxt[j] - nxt[i]).T)
+                 - edge[i] - edge[j])
+        best = int(np.argmin(delta))
+        if delta[best] < -eps:
+            jb = j[best]
+            order[i + 1:jb + 1] = order[i + 1:jb + 1][::-1].copy()
+            q = points[order]
+            nxt = np.roll(q, -1, axis=0)
+            edge = np.hypot(*(q - nxt).T)
+            improved = True
+    return order, improved
+
+
+def or_opt(points, order, max_segment=3, eps=1e-9):
+    """One Or-opt pass: move runs of 1..max_segment waypoints to their cheapest edge."""
+    improved = False
+    n = len(order)
+    for length in range(1, max_segment + 1):
+        q = points[order]
+        nxt = np.roll(q, -1, axis=0)
+        base = np.hypot(*(q - nxt).T)
+        for i in range(1, n - length):
+            first, last = q[i], q[i + length - 1]
+            prev, after = q[i - 1], q[(i + length) % n]
+            gain = base[i - 1] + base[i + length - 1] - np.hypot(*(prev - after))
+            # Insert between tour edge (k, k+1), skipping the edges touching the run itself
+            forward = np.hypot(*(q - first).T) + np.hypot(*(nxt - last).T) - base
+            backward = np.hypot(*(q - last).T) + np.hypot(*(nxt - first).T) - base
+            cost = np.minimum(forward, backward)
+            cost[i - 1:i + length] = np.inf
+            k = int(np.argmin(cost))
+            if gain - cost[k] > eps:
+                run = order[i:i + length]
+                piece = run if forward[k] <= backward[k] else run[::-1]
+                rest = np.concatenate([order[:i], order[i + length:]])
+                at = k + 1 if k < i else k + 1 - length
+                order = np.concatenate([rest[:at], piece, rest[at:]])
+                q = points[order]
+                nxt = np.roll(q, -1, axis=0)
+                base = np.hypot(*(q - nxt).T)
+                improved = True
+    return order, improved
+
+
+def improve_tour(points, order, max_passes=50):
+    """Alternate 2-opt and Or-opt passes until neither finds an improving move."""
+    if len(order) < 4:
+        return order
+    for _ in range(max_passes):
+        order, a = two_opt(points, order)
+        order, b = or_opt(points, order)
+        if not (a or b):
+            break
+    return order
+
+
+def sweep_order(points):
+    """Waypoint order along the wider axis of `points`: O(n log n), and near-optimal along a thin border."""
+    axis = int(np.argmax(np.ptp(points, axis=0))) if len(points) else 0
+    return np.lexsort((points[:, 1 - axis], points[:, axis]))
+
+
+def plan_tours(positions, starts, max_passes=50, max_points=250):
+    """Closed coverage tour per UAV over `positions`, as (n_i x 2) waypoint arrays.
+
+    Waypoints are split into one balanced group per UAV, in the UAVs'
+    left-to-right order. Each group gets a nearest-neighbour tour improved by
+    2-opt and Or-opt, rotated to begin at the waypoint nearest that UAV's
+    start. Those passes cost time quadratic in the group size, so groups of
+    more than `max_points` waypoints get a sweep along their wider axis
+    instead. A UAV left without waypoints (more UAVs than devices) patrols
+    the whole layout.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    groups = balanced_partition(positions, len(starts))
+    tours = []
+    for start, group in zip(starts, groups):
+        if not len(group):
+            group = np.arange(len(positions))
+        if not len(group):
+            tours.append(start[None, :].copy())
+            continue
+        points = positions[group]
+        if len(points) > max_points:
+            order = sweep_order(points)
+        else:
+            order = nearest_neighbour_tour(points, int(np.argmin(((points - start) ** 2).sum(axis=1))))
+            order = improve_tour(points, order, max_passes)
+        tour = points[order]
+        tours.append(np.roll(tour, -int(np.argmin(((tour - start) ** 2).sum(axis=1))), axis=0))
+    return tours
+
+
+def layout_key(positions, starts, max_passes, max_points):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(positions, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(starts, dtype=np.float64).tobytes())
+    digest.update(f"{max_passes}|{max_points}|{PLANNER_VERSION}".encode())
+    return digest.hexdigest()[:24]
+
+
+def cached_tours(positions, starts, cache_dir=None, max_passes=50, max_entries=64, max_points=250):
+    """plan_tours(), memoized on disk under a hash of the layout, UAV starts and planner version.
+
+    Every seed jitters the layout differently, so the cache keeps at most
+    `max_entries` tour files and evicts the least recently used beyond that.
+    """
+    if not cache_dir:
+        return plan_tours(positions, starts, max_passes, max_points)
+    path = os.path.join(cache_dir, f"tours-{layout_key(positions, starts, max_passes, max_points)}.npz")
+    if os.path.exists(path):
+        with np.load(path) as data:
+            tours = np.split(data['waypoints'], data['offsets'][1:-1])
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:  # Evicted by a concurrent run meanwhile
+            pass
+        return tours
+    tours = plan_tours(positions, starts, max_passes, max_points)
+    os.makedirs(cache_dir, exist_ok=True)
+    offsets = np.cumsum([0] + [len(tour) for tour in tours])
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, waypoints=np.concatenate(tours), offsets=offsets)
+    os.replace(tmp, path)
+    _evict(cache_dir, max_entries)
+    return tours
+
+
+def _evict(cache_dir, max_entries):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.startswith('tours-') and name.endswith('.npz') and '.tmp' not in name:
+            try:
+                entries.append((os.path.getmtime(os.path.join(cache_dir, name)), name))
+            except FileNotFoundError:  # Evicted by a concurrent run
+                pass
+    entries.sort()
+    for _, name in entries[:max(0, len(entries) - max_entries)]:
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+def patrol_paths(config, device_positions, uav_starts):
+    """The UAV patrol paths selected by config['patrol']: optimized tours or x-sorted segments."""
+    patrol = config.get('patrol', {})
+    if patrol.get('planner', 'tour') == 'segments':
+        return border_segments(device_positions, len(uav_starts))
+    return cached_tours(device_positions, uav_starts, patrol.get('cache_dir'), patrol.get('max_passes', 50),
+                        patrol.get('cache_entries', 64), patrol.get('max_points', 250))
+
+
+def border_segments(device_positions, n_uavs):
+    """The original patrol: devices sorted by x, cut into one contiguous segment per UAV."""
+    positions = np.asarray(device_positions, dtype=float).reshape(-1, 2)
+    border = positions[np.argsort(positions[:, 0], kind='stable')]
+    segment = max(1, len(border) // max(1, n_uavs))
+    paths = []
+    for i in range(n_uavs):
+        path = border[i * segment:min((i + 1) * segment, len(border))]
+        paths.append(path if len(path) else border)  # Fallback to entire border if segment is empty
+    return paths
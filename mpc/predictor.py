@@ -14,9 +14,16 @@ class GMMPredictor:
             gmm.fit(data)
             self.models[device_id] = gmm
 
+    def train_batch(self, device_ids, histories):
+        for device_id, energy_history in zip(device_ids, histories):
+            self.train(device_id, energy_history)
+
     def predict(self, device_id):
         if device_id in self.models:
             gmm = self.models[device_id]
             mean = np.dot(gmm.weights_, gmm.means_.flatten())
             return max(mean, 0.1)  # Ensure positive prediction
         return 1.0  # Default fallback
+
+    def predict_batch(self, device_ids):
+        return np.array([self.predict(i) for i in device_ids])
@@ -1,9 +1,64 @@
 # offloading/offloading_manager.py
+import numpy as np
+from models.energy_model import EnergyModel
+from simulation.scenario import Scenario
+
+
+def regret_assign(cost, feasible, data, task_energy, room_mb, room_energy, group=None):
+    """Regret-greedy assignment of tasks (rows) to UAVs (columns) under capacity limits.
+
+    Each round every pending task bids for its cheapest feasible UAV; per UAV
+    the tasks with the largest regret (second-best minus best cost) are
+    accepted while its data room (`room_mb`) and energy room (`room_energy`,
+    spent at `task_energy` per task) last, and rejected bids drop that UAV
+    from the task's feasible set.
+
+    `group` optionally gives each task an offset into the flat room arrays,
+    so tasks of several independent replicas (replica * n_uavs) can be
+    solved in one call. Room arrays are updated in place. Returns the
+    column index chosen for each task, or -1.
+    """
+    feasible = feasible.copy()
+    n_tasks, n_uavs = cost.shape
+    offset = np.zeros(n_tasks, dtype=np.int64) if group is None else np.asarray(group, dtype=np.int64)
+    assigned = np.full(n_tasks, -1)
+    pending = feasible.any(axis=1)
+    while pending.any():
+        masked = np.where(feasible[pending], cost[pending], np.inf)
+        if n_uavs > 1:
+            two = np.partition(masked, 1, axis=1)[:, :2]
+            regret = two[:, 1] - two[:, 0]
+        else:
+            regret = np.full(len(masked), np.inf)
+        best = np.argmin(masked, axis=1)
+        tasks_idx = np.flatnonzero(pending)
+        slot = offset[tasks_idx] + best
+
+        # Within each UAV, serve the highest-regret tasks first up to its limits
+        order = np.lexsort((tasks_idx, -regret, slot))
+        slot_of, uav_of, task_of = slot[order], best[order], tasks_idx[order]
+        group_start = np.flatnonzero(np.r_[True, slot_of[1:] != slot_of[:-1]])
+        group_len = np.diff(np.r_[group_start, len(order)])
+        cum_mb = np.cumsum(data[task_of])
+        cum_mb -= np.repeat(cum_mb[group_start] - data[task_of[group_start]], group_len)
+        cum_energy = np.cumsum(task_energy[task_of])
+        cum_energy -= np.repeat(cum_energy[group_start] - task_energy[task_of[group_start]], group_len)
+        accept = (cum_mb <= room_mb[slot_of]) & (cum_energy <= room_energy[slot_of])
+
+        assigned[task_of[accept]] = uav_of[accept]
+        np.subtract.at(room_mb, slot_of[accept], data[task_of[accept]])
+        np.subtract.at(room_energy, slot_of[accept], task_energy[task_of[accept]])
+        feasible[task_of[~accept], uav_of[~accept]] = False
+        pending = (assigned < 0) & feasible.any(axis=1)
+    return assigned
+
 
 class OffloadingManager:
-    def __init__(self, uavs, config):
+    def __init__(self, uavs, config, scenario=None):
         self.uavs = uavs
         self.config = config
+        self.scenario = scenario or Scenario.from_config(config)
+        self.energy_model = EnergyModel.from_config(config)
 
     def assign_task(self, device, task):
         """Assign a task to a UAV based on distance and load (simplified ECOP logic)."""
@@ -13,8 +68,69 @@ class OffloadingManager:
                           + (100 - u.energy)  # penalize low energy UAVs
         )
         distance = device.distance_to(best_uav.x, best_uav.y)
-        if distance <= self.config['uav']['service_range']:
+        if distance <= self.scenario.uav.service_range:
             # Assume offloading accepted
-            best_uav.energy -= 0.5  # Offloading cost
+            best_uav.energy -= float(self.energy_model.task_costs(task['data_size']))  # Offloading cost
             return best_uav.id
         return None
+
+    def assign_batch(self, tasks):
+        """Assign every task of a slot at once under per-UAV capacity and energy limits.
+
+        Builds the (tasks x UAVs) cost matrix of assign_task in one step and
+        solves it greedily by regret: tasks whose best UAV is much cheaper than
+        their second best choose first, and each UAV accepts them until its
+        data capacity (offloading.uav_capacity, MB per slot) or its energy
+        budget for offloading runs out. A task costs its UAV the energy model's
+        offload cost plus its payload cost. Rejected tasks fall back to their
+        next UAV in the following round.
+
+        Returns (assignments, stats): the UAV id or None for each task, and
+        acceptance statistics for the slot.
+        """
+        offloading = self.scenario.offloading
+        capacity = offloading.uav_capacity
+        reserve = offloading.energy_reserve
+
+        n_tasks, n_uavs = len(tasks), len(self.uavs)
+        if n_tasks == 0 or n_uavs == 0:
+            assigned = np.full(n_tasks, -1)
+            return [None] * n_tasks, self._stats(assigned, np.zeros(n_tasks), np.zeros(n_tasks, dtype=bool))
+
+        task_pos = np.array([task['position'] for task in tasks], dtype=float)
+        data = np.array([task['data_size'] for task in tasks], dtype=float)
+        uav_pos = np.array([(u.x, u.y) for u in self.uavs], dtype=float)
+        energy = np.array([u.energy for u in self.uavs], dtype=float)
+
+        diff = task_pos[:, None, :] - uav_pos[None, :, :]
+        dist_sq = np.einsum('tuk,tuk->tu', diff, diff)
+        cost = dist_sq + (100 - energy)[None, :]  # penalize low energy UAVs
+        feasible = dist_sq <= self.scenario.uav.service_range_sq
+        reachable = feasible.any(axis=1)
+
+        room_mb = np.full(n_uavs, np.inf if capacity is None else float(capacity))
+        room_energy = np.maximum(energy - reserve, 0.0)
+        task_energy = self.energy_model.task_costs(data)
+        assigned = regret_assign(cost, feasible, data, task_energy, room_mb, room_energy)
+
+        accepted = assigned >= 0
+        spent = np.bincount(assigned[accepted], weights=task_energy[accepted], minlength=n_uavs)
+        for uav, amount in zip(self.uavs, spent):
+            if amount:
+                uav.energy -= amount  # Offloading cost
+        ids = [u.id for u in self.uavs]
+        assignments = [ids[a] if a >= 0 else None for a in assigned]
+        return assignments, self._stats(assigned, data, reachable)
+
+    def _stats(self, assigned, data, reachable):
+        accepted = assigned >= 0
+        n_tasks = len(assigned)
+        return {
+            'tasks': n_tasks,
+            'accepted': int(accepted.sum()),
+            'out_of_range': int((~reachable).sum()),
+            'over_capacity': int((reachable & ~accepted).sum()),
+            'acceptance_rate': float(accepted.mean()) if n_tasks else 0.0,
+            'data_offloaded': float(data[accepted].sum()),
+            'per_uav': np.bincount(assigned[accepted], minlength=len(self.uavs)).tolist(),
+        }
@@ -0,0 +1,150 @@
+# offloading/task_queue.py
+import heapq
+import numpy as np
+
+URGENCY_PRIORITY = {'high': 0, 'medium': 1, 'low': 2}
+DEFAULT_DEADLINES = {'high': 1.0, 'medium': 3.0, 'low': 10.0}
+QUEUED, OVERDUE, DONE = 0, 1, 2
+# Completed-task delays go into log-spaced bins 1% wide starting at 0.01 slots (bin 0 holds anything
+# shorter), so whole-run percentiles are within 1% in fixed memory; the last bin ends past 4e6 slots
+DELAY_MIN = 0.01
+DELAY_GROWTH = 1.01
+DELAY_BINS = 2000
+
+
+class TaskQueues:
+    """Per-UAV priority queues for offloaded tasks, served at a fixed data rate.
+
+    Tasks are ordered by urgency (high, then medium, then low), and by
+    arrival within an urgency level. Every slot each UAV works through
+    `service_rate` MB of its queue. A task that does not fit finishes in a
+    later slot with its remaining data carried over. Completion times are
+    fractional within the slot, so a 30 MB task served first at 100 MB/slot
+    completes 0.3 slots after the slot starts.
+
+    Deadlines are per urgency level, in slots from arrival. A task misses its
+    deadline once, in the slot the deadline passes while it is still queued,
+    or in the slot it completes late. Overdue tasks stay queued and are
+    served as usual, so a saturated backlog shows up as misses straight away
+    rather than only as tasks drain.
+
+    `offloading` is the scenario's OffloadingSpec.
+    """
+
+    def __init__(self, uav_ids, offloading):
+        self.service_rate = float(offloading.service_rate)
+        self.deadlines = {**DEFAULT_DEADLINES, **dict(offloading.deadlines)}
+        self.column = {uav_id: i for i, uav_id in enumerate(uav_ids)}
+        self.queues = [[] for _ in uav_ids]
+        # Min-heap of (deadline, seq, entry) over every queued task, to find newly overdue ones
+        self.due = []
+        self.backlog_mb = np.zeros(len(uav_ids))
+        self._seq = 0
+        self.delay_counts = np.zeros(DELAY_BINS, dtype=np.int64)
+        self.delay_min = np.inf
+        self.delay_max = 0.0
+        self.completed = 0
+        self.missed = 0
+        self.overdue_queued = 0
+        self.served_mb = 0.0
+        self.slots = 0
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues)
+
+    def enqueue(self, tasks, assignments, t):
+        """Queue every accepted task (assignment not None) on its UAV, arriving at slot t."""
+        for task, uav_id in zip(tasks, assignments):
+            if uav_id is None:
+                continue
+            urgency = task['urgency']
+            column = self.column[uav_id]
+            entry = [URGENCY_PRIORITY[urgency], float(t), self._seq,
+                     float(task['data_size']), t + self.deadlines[urgency], task['device_id'], QUEUED]
+            heapq.heappush(self.queues[column], entry)
+            heapq.heappush(self.due, (entry[4], self._seq, entry))
+            self.backlog_mb[column] += task['data_size']
+            self._seq += 1
+
+    def serve(self, t):
+        """Run slot t of service on every UAV; returns the slot's throughput and delay stats."""
+        delays = []
+        missed = 0
+        served = np.zeros(len(self.queues))
+        for column, queue in enumerate(self.queues):
+            budget = self.service_rate
+            while queue and budget > 0:
+                entry = queue[0]
+                work = min(entry[3], budget)
+                entry[3] -= work
+                budget -= work
+                if entry[3] > 0:
+                    break  # Carries over, still at the head of the queue
+                heapq.heappop(queue)
+                done = t + (self.service_rate - budget) / self.service_rate
+                delays.append(done - entry[1])
+                if entry[6] == OVERDUE:
+                    self.overdue_queued -= 1  # Already counted when its deadline passed
+                else:
+                    missed += done > entry[4]
+                entry[6] = DONE
+            served[column] = self.service_rate - budget
+        # Anything still queued at the end of the slot completes after t + 1
+        due = self.due
+        while due and due[0][0] <= t + 1:
+            entry = heapq.heappop(due)[2]
+            if entry[6] == QUEUED:
+                entry[6] = OVERDUE
+                missed += 1
+                self.overdue_queued += 1
+        self.backlog_mb -= served
+        self._record_delays(delays)
+        self.completed += len(delays)
+        self.missed += missed
+        self.served_mb += served.sum()
+        self.slots += 1
+        return {
+            'throughput_mb': float(served.sum()),
+            'tasks_completed': len(delays),
+            'deadline_misses': int(missed),
+            'backlog_mb': float(self.backlog_mb.sum()),
+            'queued_tasks': len(self),
+            'overdue_tasks': self.overdue_queued,
+            'mean_delay': float(np.mean(delays)) if delays else 0.0,
+        }
+
+    def _record_delays(self, delays):
+        if not delays:
+            return
+        delays = np.asarray(delays)
+        bins = np.zeros(len(delays), dtype=np.int64)
+        long = delays >= DELAY_MIN
+        bins[long] = 1 + np.floor(np.log(delays[long] / DELAY_MIN) / np.log(DELAY_GROWTH)).astype(np.int64)
+        self.delay_counts += np.bincount(np.minimum(bins, DELAY_BINS - 1), minlength=DELAY_BINS)
+        self.delay_min = min(self.delay_min, float(delays.min()))
+        self.delay_max = max(self.delay_max, float(delays.max()))
+
+    def delay_percentiles(self, qs):
+        """Approximate delay percentiles from the histogram: each bin's midpoint, clipped to the observed range."""
+        cumulative = np.cumsum(self.delay_counts)
+        bins = np.minimum(np.searchsorted(cumulative, np.asarray(qs) / 100.0 * cumulative[-1]), DELAY_BINS - 1)
+        upper = DELAY_MIN * DELAY_GROWTH ** bins
+        lower = np.where(bins > 0, upper / DELAY_GROWTH, 0.0)
+        return np.clip((lower + upper) / 2, self.delay_min, self.delay_max)
+
+    def summary(self):
+        """Whole-run throughput (MB per slot), queueing delay percentiles (slots) and deadline misses."""
+        p50, p95, p99 = self.delay_percentiles([50, 95, 99]) if self.completed else (None, None, None)
+        decided = self.completed + self.overdue_queued
+        return {
+            'throughput_mb_per_slot': float(self.served_mb / self.slots) if self.slots else 0.0,
+            'tasks_completed': self.completed,
+            'delay_p50': None if p50 is None else float(p50),
+            'delay_p95': None if p95 is None else float(p95),
+            'delay_p99': None if p99 is None else float(p99),
+            'deadline_misses': self.missed,
+            # Over every task whose outcome is known: completed, or still queued but already late
+            'miss_rate': self.missed / decided if decided else 0.0,
+            'backlog_mb': float(self.backlog_mb.sum()),
+            'queued_tasks': len(self),
+        }
@@ -0,0 +1,235 @@
+# simulation/agent_runtime.py
+import asyncio
+import json
+import math
+import time
+import numpy as np
+
+MESSAGE_FIELDS = ('src', 'slot', 'x', 'y', 'target_x', 'target_y', 'energy')
+
+
+class Transport:
+    """In-process message bus between agents with simulated latency and loss.
+
+    Every message is a flat dict with exactly MESSAGE_FIELDS, at most
+    `max_bytes` when JSON-encoded. Delivery is delayed by latency_ms plus
+    uniform jitter, drops with probability `loss`, and fails when the
+    receiver's inbox already holds `inbox_size` messages. Each delivered
+    message records its measured latency. `seed` is an int or a Generator.
+    """
+
+    def __init__(self, latency_ms=2.0, jitter_ms=1.0, loss=0.0, inbox_size=64, max_bytes=256, seed=0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.loss = loss
+        self.inbox_size = inbox_size
+        self.max_bytes = max_bytes
+        self.rng = np.random.default_rng(seed)
+        self.inboxes = {}
+        self.latencies = []
+        self.sent = 0
+        self.lost = 0
+        self.overflowed = 0
+
+    def register(self, agent_id):
+        self.inboxes[agent_id] = asyncio.Queue(maxsize=self.inbox_size)
+        return self.inboxes[agent_id]
+
+    def send(self, dst, message):
+        if set(message) != set(MESSAGE_FIELDS):
+            raise ValueError(f"Message fields must be {MESSAGE_FIELDS}, got {tuple(message)}")
+        if len(json.dumps(message)) > self.max_bytes:
+            raise ValueError(f"Message exceeds {self.max_bytes} bytes")
+        self.sent += 1
+        if self.rng.random() < self.loss:
+            self.lost += 1
+            return
+        delay = self.latency + self.rng.uniform(0.0, self.jitter)
+        asyncio.get_running_loop().call_later(delay, self._deliver, dst, message, time.perf_counter())
+
+    def _deliver(self, dst, message, sent_at):
+        try:
+            self.inboxes[dst].put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed += 1
+            return
+        self.latencies.append((time.perf_counter() - sent_at) * 1000.0)
+
+
+class UAVAgent:
+    """One UAV deciding from its local view and its neighbours' last messages.
+
+    The agent sees only active devices within `view_radius` of its own
+    position. It skips devices within service range of a target that a
+    neighbour last reported claiming, and otherwise picks the nearest one,
+    like the centralized greedy step. Information from neighbours is
+    therefore at least one message delay old. An agent that targets nothing
+    broadcasts a null target, which withdraws its previous claim.
+
+    Moves are charged like the centralized controller's: the flight cost
+    from `cost_table` plus `hover_cost` for the slot spent over the target.
+    """
+
+    def __init__(self, uav, transport, config, cost_table=None, hover_cost=0.0):
+        self.uav = uav
+        self.cost_table = cost_table
+        self.hover_cost = hover_cost
+        self.id = uav.id
+        self.transport = transport
+        self.inbox = transport.register(uav.id)
+        self.service_range = config['uav']['service_range']
+        agents = config.get('agents', {})
+        self.view_radius = agents.get('view_radius') or config['iot']['sensing_range']
+        self.claims = {}  # neighbour id -> (slot, target)
+        self.decision_ms = []
+        self.received = 0
+
+    def _drain_inbox(self):
+        while not self.inbox.empty():
+            message = self.inbox.get_nowait()
+            self.received += 1
+            previous = self.claims.get(message['src'])
+            if previous is None or message['slot'] >= previous[0]:
+                target = None if message['target_x'] is None else (message['target_x'], message['target_y'])
+                self.claims[message['src']] = (message['slot'], target)
+
+    def decide(self, device_positions, active):
+        """Pick a target from the local view, or None if nothing active is visible."""
+        visible = active & (np.hypot(device_positions[:, 0] - self.uav.x,
+                                     device_positions[:, 1] - self.uav.y) <= self.view_radius)
+        candidates = np.flatnonzero(visible)
+        if not len(candidates):
+            return None
+        free = np.ones(len(candidates), dtype=bool)
+        for _, claim in self.claims.values():
+            if claim is None:
+                continue
+            tx, ty = claim
+            free &= np.hypot(device_positions[candidates, 0] - tx,
+                             device_positions[candidates, 1] - ty) > self.service_range
+        if free.any():
+            candidates = candidates[free]
+        d2 = ((device_positions[candidates] - (self.uav.x, self.uav.y)) ** 2).sum(axis=1)
+        return candidates[np.argmin(d2)]
+
+    async def act(self, t, device_positions, active, neighbours):
+        self._drain_inbox()
+        start = time.perf_counter()
+        target = self.decide(device_positions, active)
+        self.decision_ms.append((time.perf_counter() - start) * 1000.0)
+        target_x = target_y = None
+        if target is not None:
+            cost = None if self.cost_table is None else float(
+                self.cost_table.move_cost(self.uav.x, self.uav.y, target)) + self.hover_cost
+            self.uav.move_to(*device_positions[target], cost=cost)
+            target_x, target_y = float(self.uav.x), float(self.uav.y)
+        message = {'src': self.id, 'slot': t, 'x': float(self.uav.x), 'y': float(self.uav.y),
+                   'target_x': target_x, 'target_y': target_y,
+                   'energy': float(self.uav.energy)}
+        for other in neighbours:
+            self.transport.send(other, message)
+        await asyncio.sleep(0)
+        return target
+
+
+class AgentRuntime:
+    """Runs a DecentralizedUAVSystem with each UAV as an asyncio agent.
+
+    The forecast, offload, threat and metric phases are the system's own.
+    The optimize phase is replaced by every agent acting concurrently on its
+    local view. The slot then stays open for `slot_ms` so messages in flight
+    can land; anything later arrives in a following slot. Neighbours are the
+    UAVs within `comm_range`, or every other UAV when it is unset.
+    """
+
+    def __init__(self, system):
+        self.system = system
+        agents = system.config.get('agents', {})
+        self.slot_ms = agents.get('slot_ms', 10.0)
+        self.comm_range = agents.get('comm_range')
+        self.transport_args = dict(
+            latency_ms=agents.get('latency_ms', 2.0), jitter_ms=agents.get('jitter_ms', 1.0),
+            loss=agents.get('loss', 0.0), inbox_size=agents.get('inbox_size', 64),
+            max_bytes=agents.get('max_message_bytes', 256))
+        self.transport = None
+        self.agents = []
+
+    def run_simulation(self):
+        return asyncio.run(self._run())
+
+    async def _run(self):
+        system = self.system
+        # Loss and jitter come from the system's own RNGService, so each seeded replica sees its own network
+        self.transport = Transport(**self.transport_args, seed=system.rng.stream('transport'))
+        controller = system.controller
+        self.agents = [UAVAgent(uav, self.transport, system.config, controller.cost_table, controller.hover_cost)
+                       for uav in system.uavs]
+        for t in range(system.next_slot, system.time_slots):
+            print(f"[TIME {t}] Running agent decisions...")
+            await self.step(t)
+        system.close()
+        return system.metrics
+
+    def neighbours(self, agent):
+        if self.comm_range is None:
+            return [other.id for other in self.agents if other is not agent]
+        return [other.id for other in self.agents if other is not agent
+                and math.hypot(agent.uav.x - other.uav.x, agent.uav.y - other.uav.y) <= self.comm_range]
+
+    async def step(self, t):
+        system = self.system
+        instruments = system.instruments
+        system.slot = t
+        instruments.begin_slot(t)
+        with instruments.phase('forecast'):
+            system.forecast_energy(t)
+        with instruments.phase('optimize'):
+            sent, delivered = self.transport.sent, len(self.transport.latencies)
+            active_devices = await self.decide(t)
+            instruments.count('messages_sent', self.transport.sent - sent)
+            instruments.count('messages_delivered', len(self.transport.latencies) - delivered)
+        with instruments.phase('offload'):
+            system.offload_tasks(active_devices, t)
+        with instruments.phase('threats'):
+            neutralized = system.update_threats(t)
+        with instruments.phase('metrics'):
+            record = system.collect_metrics(active_devices, neutralized)
+        instruments.end_slot()
+        system.next_slot = t + 1
+        return record
+
+    async def decide(self, t):
+        system = self.system
+        forecasts = system.gmm.predict_batch([d.id for d in system.devices])
+        active = forecasts > system.scenario.offloading.energy_threshold
+        positions = system.device_state.positions
+        targets = await asyncio.gather(*(
+            agent.act(t, positions, active, self.neighbours(agent)) for agent in self.agents))
+
+        service_range = system.scenario.uav.service_range
+        consumption = system.scenario.offloading.consumption_per_slot
+        for agent, target in zip(self.agents, targets):
+            if target is not None:
+                system.device_state.drain(active & system.device_state.within(
+                    agent.uav.x, agent.uav.y, service_range), consumption)
+        await asyncio.sleep(self.slot_ms / 1000.0)
+        return [system.devices[i] for i in np.flatnonzero(active)]
+
+    def stats(self):
+        """Message latency and per-agent decision time percentiles (ms), plus delivery counts."""
+        def percentiles(values):
+            if not values:
+                return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(max(values))}
+
+        transport = self.transport
+        return {
+            'messages_sent': transport.sent,
+            'messages_delivered': len(transport.latencies),
+            'messages_lost': transport.lost,
+            'inbox_overflows': transport.overflowed,
+            'message_latency_ms': percentiles(transport.latencies),
+            'decision_ms': percentiles([ms for agent in self.agents for ms in agent.decision_ms]),
+            'per_agent_decision_ms': {agent.id: percentiles(agent.decision_ms) for agent in self.agents},
+        }
@@ -0,0 +1,321 @@
+# simulation/batched_system.py
+import numpy as np
+from models.threat_pool import ThreatPool, entry_positions
+from mpc.patrol_planner import patrol_paths
+from offloading.offloading_manager import regret_assign
+from simulation.rng import RNGService
+from simulation.scenario import Scenario
+
+# Keys that fix array shapes or control flow; replicas batched together must agree on them
+SHAPE_KEYS = ('mode', 'area_size', 'time_slots', 'iot.device_count', 'uav.count', 'gmm.history_window')
+
+
+def _get(config, dotted, default=None):
+    node = config
+    for key in dotted.split('.'):
+        if not isinstance(node, dict) or key not in node:
+            return default
+        node = node[key]
+    return node
+
+
+class BatchedUAVSystem:
+    """K replicas of DecentralizedUAVSystem advanced together in (K, ...) arrays.
+
+    Every piece of per-entity state carries a leading replica axis (device
+    energy is (K, D), UAV positions (K, U, 2), the threat pool (K, C, 2), and
+    so on). Each phase of a slot is therefore a handful of NumPy calls for
+    all replicas at once instead of a Python pass per entity and replica.
+    Replicas may be K seeds of one config or K configs that agree on
+    SHAPE_KEYS. Scalar parameters such as service range, thresholds, costs,
+    battery ranges and spawn rates may differ per replica.
+
+    The dynamics follow DecentralizedUAVSystem with the greedy planner:
+    - Each replica has its own RNGService with the scalar engine's stream
+      layout and per-slot draws, so replica k draws what a scalar run with
+      the same seed draws for its layout, energy samples and tasks.
+    - UAVs patrol the same tours (patrol_paths) as the scalar engine.
+    - Offloading uses the same regret-greedy solver, over the tasks of every
+      replica at once.
+
+    - Each replica's threat pool keeps ThreatPool's free-list stack and
+      growth, so threats take the same slots and moves as in the scalar run.
+
+    Forecasts are the window mean of each device's energy history. That is
+    the mixture mean the GMM predictors return, but not their exact output,
+    so anything that depends on the forecasts agrees with the scalar engine
+    in distribution rather than run for run.
+
+    `seed` is either one seed per replica or a single seed from which
+    replica k's is derived.
+    """
+
+    def __init__(self, configs, replicas=None, seed=0):
+        if isinstance(configs, (dict, Scenario)):
+            configs = [configs] * (replicas or 1)
+        elif replicas is not None and replicas != len(configs):
+            raise ValueError(f"Got {len(configs)} configs for {replicas} replicas")
+        if not configs:
+            raise ValueError("BatchedUAVSystem needs at least one replica")
+        # Compiling validates every replica and normalizes the mode each one's dict carries
+        self.scenarios = [Scenario.from_config(c) for c in configs]
+        configs = [scenario.to_config() for scenario in self.scenarios]
+        base = configs[0]
+        for key in SHAPE_KEYS:
+            if any(_get(c, key) != _get(base, key) for c in configs):
+                raise ValueError(f"Batched replicas must share '{key}'")
+        if any(_get(c, 'mpc.planner', 'greedy') != 'greedy' for c in configs):
+            raise ValueError("Batched simulation supports only the greedy planner")
+
+        self.configs = configs
+        self.scenario = scenario = self.scenarios[0]
+        self.mode = scenario.mode
+        self.area_size = scenario.area_size
+        self.time_slots = scenario.time_slots
+        self.window = scenario.gmm.history_window
+        self.rngs = [RNGService(s) for s in self.replica_seeds(seed, len(configs))]
+
+        def column(dotted, default=None):
+            return np.array([_get(c, dotted, default) for c in configs], dtype=float)
+
+        K = self.replicas = len(configs)
+        D = scenario.iot.device_count
+        U = scenario.uav.count
+        self.service_range = column('uav.service_range')
+        self.threshold = column('offloading.energy_threshold')
+        self.consumption = column('offloading.consumption_per_slot')
+        self.offload_cost = column('offloading.offload_cost', 0.5)
+        self.cruise_cost = column('energy.cruise_per_unit', 0.1)
+        self.payload_cost = column('energy.payload_per_mb', 0.0)
+        self.hover_cost = column('energy.hover_per_slot', 0.0)
+        self.reserve = column('offloading.energy_reserve', 0.0)
+        self.uav_capacity = np.array([np.inf if _get(c, 'offloading.uav_capacity') is None
+                                      else float(_get(c, 'offloading.uav_capacity')) for c in configs])
+
+        # Devices sit on the same wavy border line in every replica, with per-replica jitter
+        # drawn from each replica's layout stream in the scalar engine's order
+        jitter = np.empty((K, D))
+        self.device_energy = np.empty((K, D))
+        for k, (service, s) in enumerate(zip(self.rngs, self.scenarios)):
+            layout = service.stream('layout')
+            jitter[k] = layout.integers(-2, 3, size=D)
+            self.device_energy[k] = layout.uniform(*s.iot.battery_range, size=D)
+        i = np.arange(D)
+        x = np.clip((i * self.area_size / D).astype(int), 0, self.area_size - 1)
+        y = (self.area_size // 2 + 10 * np.sin(i / 15.0) + jitter).astype(int)
+        self.device_pos = np.empty((K, D, 2))
+        self.device_pos[:, :, 0] = x
+        self.device_pos[:, :, 1] = np.clip(y, 0, self.area_size - 1)
+
+        self.uav_pos = np.empty((K, U, 2))
+        self.uav_pos[:, :, 0] = [int(self.area_size * (j + 1) / (U + 1)) for j in range(U)]
+        self.uav_pos[:, :, 1] = self.area_size // 2
+        self.uav_energy = np.repeat(column('uav.battery')[:, None], U, axis=1)
+
+        # Each replica's patrol tours, padded into one (K, U, longest, 2) array
+        tours = [patrol_paths(c, self.device_pos[k], self.uav_pos[k]) for k, c in enumerate(configs)]
+        self.patrol_len = np.array([[len(tour) for tour in replica] for replica in tours])
+        self.patrol = np.zeros((K, U, self.patrol_len.max(), 2))
+        for k, replica in enumerate(tours):
+            for j, tour in enumerate(replica):
+                self.patrol[k, j, :len(tour)] = tour
+
+        self.history = np.zeros((K, D, self.window))
+        self.samples = 0
+
+        self.spawn_rate = np.array([s.spawn_rate for s in self.scenarios], dtype=float)
+        initial = np.array([s.initial_threats for s in self.scenarios], dtype=int)
+        # Per-replica ThreatPool bookkeeping over (K, C) arrays wide enough for the largest pool
+        self.pool_capacity = np.array([s.threats.pool_capacity or ThreatPool.default_capacity(
+            n, rate, self.time_slots) for s, n, rate in zip(self.scenarios, initial, self.spawn_rate)])
+        self.pool_growable = np.array([s.threats.pool_capacity is None for s in self.scenarios])
+        capacity = int(self.pool_capacity.max())
+        self.threat_pos = np.zeros((K, capacity, 2))
+        self.threat_alive = np.zeros((K, capacity), dtype=bool)
+        self.threat_neutralized = np.zeros((K, capacity), dtype=bool)
+        # Free-slot stacks, top at free[k, free_count[k] - 1], in ThreatPool's order
+        self.free = np.zeros((K, capacity), dtype=np.int64)
+        for k, n in enumerate(self.pool_capacity):
+            self.free[k, :n] = np.arange(n)[::-1]
+        self.free_count = self.pool_capacity.copy()
+        self.threats_dropped = np.zeros(K, dtype=np.int64)
+        self._spawn(initial, [service.stream('threats') for service in self.rngs])
+
+        self.active = np.zeros((K, D), dtype=bool)
+        self.uav_tasks = np.zeros((K, U), dtype=np.int64)
+        self.metrics = {name: np.zeros((self.time_slots, K))
+                        for name in ('energy_efficiency', 'total_energy', 'threats_handled')}
+        self.next_slot = 0
+
+    @staticmethod
+    def replica_seeds(seed, replicas):
+        if isinstance(seed, (list, tuple, np.ndarray)):
+            if len(seed) != replicas:
+                raise ValueError(f"Got {len(seed)} seeds for {replicas} replicas")
+            return list(seed)
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(int(seed))
+        return [np.random.SeedSequence(seed.entropy, spawn_key=tuple(seed.spawn_key) + (k,))
+                for k in range(replicas)]
+
+    def run_simulation(self):
+        """Run every slot; returns one metrics dict per replica, as DecentralizedUAVSystem does."""
+        for t in range(self.next_slot, self.time_slots):
+            self.step(t)
+        return [self.replica_metrics(k) for k in range(self.replicas)]
+
+    def replica_metrics(self, k):
+        upto = self.next_slot
+        return {
+            'energy_efficiency': self.metrics['energy_efficiency'][:upto, k].tolist(),
+            'total_energy': self.metrics['total_energy'][:upto, k].tolist(),
+            'threats_handled': self.metrics['threats_handled'][:upto, k].astype(int).tolist(),
+        }
+
+    def step(self, t):
+        """Advance every replica by one time slot."""
+        self.forecast_energy(t)
+        self.plan_uavs(t)
+        if self.scenario.offloading_enabled:  # Don't offload in MPC-only
+            self.offload_tasks(t)
+        neutralized = self.update_threats(t) if self.scenario.threats_enabled else np.zeros(self.replicas)
+        self.collect_metrics(t, neutralized)
+        self.next_slot = t + 1
+
+    def forecast_energy(self, t):
+        D = self.active.shape[1]
+        self.history[:, :, self.samples % self.window] = [service.energy_samples(t, D) for service in self.rngs]
+        self.samples += 1
+        filled = min(self.samples, self.window)
+        mean = self.history.sum(axis=2) / filled
+        # The predictors fall back to 1.0 until a window holds one sample per component
+        self.forecast = np.where(filled >= 2, np.maximum(mean, 0.1), 1.0)
+
+    def plan_uavs(self, t):
+        self.active = self.forecast > self.threshold[:, None]
+        has_active = self.active.any(axis=1)
+        r2 = (self.service_range ** 2)[:, None]
+        drained = np.zeros(self.active.shape, dtype=np.int64)
+        rows = np.arange(self.replicas)
+        dev_x, dev_y = self.device_pos[:, :, 0], self.device_pos[:, :, 1]
+        for j in range(self.uav_pos.shape[1]):
+            # Nearest active device (lowest index on ties), then serve everything in range of it
+            dx, dy = dev_x - self.uav_pos[:, j, 0, None], dev_y - self.uav_pos[:, j, 1, None]
+            d2 = dx * dx + dy * dy
+            target = np.where(self.active, d2, np.inf).argmin(axis=1)
+            target_pos = self.device_pos[rows, target]
+            distance = np.sqrt(d2[rows, target])
+            # Flight plus one slot hovering over the target, as EnergyModel costs it
+            self.uav_energy[:, j] -= np.where(has_active, distance * self.cruise_cost + self.hover_cost, 0.0)
+            dx, dy = dev_x - target_pos[:, 0, None], dev_y - target_pos[:, 1, None]
+            in_range = dx * dx + dy * dy <= r2
+            drained += self.active & in_range & has_active[:, None]
+        # Repeated drains clamp at zero just like one drain of the summed amount
+        hit = drained > 0
+        self.device_energy[hit] = np.maximum(
+            self.device_energy[hit] - (drained * self.consumption[:, None])[hit], 0.0)
+
+        # Snap to the patrol tours
+        K, U = self.patrol_len.shape
+        self.uav_pos[:] = self.patrol[np.arange(K)[:, None], np.arange(U), t % self.patrol_len]
+
+    def offload_tasks(self, t):
+        K, U = self.uav_energy.shape
+        D = self.active.shape[1]
+        data_size = np.array([service.tasks(t, D)[0] for service in self.rngs])  # in MB
+        replica, device = np.nonzero(self.active)
+        self.uav_tasks = np.zeros((K, U), dtype=np.int64)
+        if not len(replica):
+            return
+        diff = self.device_pos[replica, device][:, None, :] - self.uav_pos[replica]
+        dist_sq = np.einsum('tuk,tuk->tu', diff, diff)
+        cost = dist_sq + (100 - self.uav_energy[replica])  # penalize low energy UAVs
+        feasible = dist_sq <= (self.service_range ** 2)[replica, None]
+        room_mb = np.repeat(self.uav_capacity, U)
+        room_energy = np.maximum(self.uav_energy - self.reserve[:, None], 0.0).ravel()
+        data = data_size[replica, device].astype(float)
+        task_energy = self.offload_cost[replica] + self.payload_cost[replica] * data
+        assigned = regret_assign(cost, feasible, data, task_energy, room_mb, room_energy, group=replica * U)
+        accepted = assigned >= 0
+        slot = replica[accepted] * U + assigned[accepted]
+        self.uav_tasks = np.bincount(slot, minlength=K * U).reshape(K, U)
+        self.uav_energy -= np.bincount(slot, weights=task_energy[accepted],
+                                       minlength=K * U).reshape(K, U)  # Offloading cost
+
+    def _spawn(self, counts, rngs):
+        """Pop slots off replica k's free stack for counts[k] new threats drawn from rngs[k], as ThreatPool.spawn.
+
+        Every arrival's position is drawn even if a fixed-size pool is full
+        and it is dropped.
+        """
+        for k, (n, rng) in enumerate(zip(counts, rngs)):
+            n = int(n)
+            positions = entry_positions(self.area_size, n, rng)
+            capacity, top = int(self.pool_capacity[k]), int(self.free_count[k])
+            if self.pool_growable[k] and n > top:
+                self._grow_pool(k, max(8, 2 * capacity, capacity + n - top))
+                top = int(self.free_count[k])
+            placed = min(n, top)
+            self.threats_dropped[k] += n - placed
+            slots = self.free[k, top - placed:top][::-1]
+            self.free_count[k] -= placed
+            self.threat_pos[k, slots] = positions[:placed]
+            self.threat_alive[k, slots] = True
+            self.threat_neutralized[k, slots] = False
+
+    def _grow_pool(self, k, capacity):
+        """Extend replica k's pool to `capacity` slots, new ones beneath its free slots, as ThreatPool._grow."""
+        if capacity > self.threat_alive.shape[1]:
+            for name in ('threat_pos', 'threat_alive', 'threat_neutralized', 'free'):
+                column = getattr(self, name)
+                grown = np.zeros((self.replicas, capacity) + column.shape[2:], dtype=column.dtype)
+                grown[:, :column.shape[1]] = column
+                setattr(self, name, grown)
+        added = np.arange(self.pool_capacity[k], capacity)
+        top = self.free_count[k]
+        self.free[k, len(added):len(added) + top] = self.free[k, :top].copy()
+        self.free[k, :len(added)] = added[::-1]
+        self.free_count[k] += len(added)
+        self.pool_capacity[k] = capacity
+
+    def _retire(self):
+        """Push last slot's neutralized threats back on their replica's free stack, as ThreatPool.retire."""
+        retired = self.threat_alive & self.threat_neutralized
+        for k in np.flatnonzero(retired.any(axis=1)):
+            slots = np.flatnonzero(retired[k])
+            top = self.free_count[k]
+            self.free[k, top:top + len(slots)] = slots[::-1]
+            self.free_count[k] += len(slots)
+        self.threat_alive &= ~retired
+
+    def update_threats(self, t):
+        rngs = [service.stream('threats', t) for service in self.rngs]
+        # Retire last slot's neutralized threats, then let new intruders in
+        self._retire()
+        self._spawn([rng.poisson(rate) if rate else 0 for rng, rate in zip(rngs, self.spawn_rate)], rngs)
+
+        # Work on the flat list of live threats only; the pool is mostly free slots early on
+        replica, slot = np.nonzero(self.threat_alive & ~self.threat_neutralized)
+        moving = self.threat_pos[replica, slot]
+        # Per-replica draws in ThreatPool.step's order: every dy, then every dx
+        counts = np.bincount(replica, minlength=self.replicas)
+        draws = [(rng.integers(1, 4, size=n), rng.integers(-2, 3, size=n)) for rng, n in zip(rngs, counts)]
+        dy = np.concatenate([d[0] for d in draws])
+        dx = np.concatenate([d[1] for d in draws])
+        direction = np.where(moving[:, 1] > self.area_size // 2, -1, 1)
+        moving[:, 1] = np.clip(moving[:, 1] + direction * dy, 0, self.area_size - 1)
+        moving[:, 0] = np.clip(moving[:, 0] + dx, 0, self.area_size - 1)
+        self.threat_pos[replica, slot] = moving
+
+        diff = moving[:, None, :] - self.uav_pos[replica]
+        near = (np.einsum('tuk,tuk->tu', diff, diff) <= (self.service_range ** 2)[replica, None]).any(axis=1)
+        self.threat_neutralized[replica[near], slot[near]] = True
+        return np.bincount(replica[near], minlength=self.replicas)
+
+    def collect_metrics(self, t, neutralized):
+        energy_spent = self.device_energy.sum(axis=1) + self.uav_energy.sum(axis=1)
+        served = self.active.sum(axis=1)
+        positive = energy_spent > 0
+        self.metrics['energy_efficiency'][t] = np.where(positive, served / np.where(positive, energy_spent, 1), 0)
+        self.metrics['total_energy'][t] = energy_spent
+        self.metrics['threats_handled'][t] = neutralized
@@ -0,0 +1,96 @@
+# simulation/checkpoint.py
+import os
+import pickle
+import zlib
+
+from simulation.rng import RNGService
+
+CHECKPOINT_VERSION = 9
+
+
+def save_checkpoint(system, path):
+    """Write a compressed snapshot of the full simulation state, its RNG streams included.
+
+    The file is written next to `path` and renamed into place, so an
+    interrupted save never clobbers the previous checkpoint.
+    """
+    payload = {
+        'version': CHECKPOINT_VERSION,
+        'system': system,
+    }
+    blob = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    with open(path, 'rb') as f:
+        payload = pickle.loads(zlib.decompress(f.read()))
+    if payload.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {payload.get('version')!r} in {path}")
+    return payload['system']
+
+
+def load_checkpoint(path):
+    """Rebuild a DecentralizedUAVSystem from `path`, positioned at the slot after the snapshot.
+
+    Its metric stream and trajectory spill are cut back to the snapshot in
+    place, so the run continues exactly where the checkpoint left off.
+    """
+    system = _load(path)
+    system.reopen_outputs()
+    return system
+
+
+def resume(path):
+    """Continue a run from its last checkpoint; returns the same metrics as an uninterrupted run."""
+    system = load_checkpoint(path)
+    return system.run_simulation()
+
+
+def branch_path(path, branch):
+    """`path` with a '-fork-<branch>' suffix ahead of any file extension."""
+    root, ext = os.path.splitext(path.rstrip('/\\'))
+    return f"{root}-fork-{branch}{ext}"
+
+
+def fork(path, seed=None, branch=None):
+    """Independent copy of a warmed-up state, e.g. for what-if branches.
+
+    With `seed` the system's RNG streams are reseeded so branches diverge;
+    without it the branch replays exactly what the original run would
+    have drawn. Every file the branch writes (metric stream, trajectory
+    spill, checkpoints, instrumentation) moves to a path suffixed with
+    `branch`, which defaults to the seed. The data recorded up to the
+    snapshot is copied over and the original run's files are not touched.
+    A branch whose metric stream or spill directory already exists is
+    rejected rather than overwritten.
+    """
+    system = _load(path)
+    if branch is None:
+        branch = seed
+    config = system.config
+    outputs = [('metrics', 'stream_path'), ('trajectory', 'spill_dir'),
+               ('checkpoint', 'path'), ('instrumentation', 'path')]
+    if branch is None and any(config.get(section, {}).get(key) for section, key in outputs[:2]):
+        raise ValueError("fork() needs a seed or branch name to give the branch its own output paths")
+    moved = {}
+    for section, key in outputs:
+        original = config.get(section, {}).get(key)
+        if original:
+            moved[section, key] = branch_path(original, branch)
+    for section, key in outputs[:2]:
+        target = moved.get((section, key))
+        if target is not None and os.path.exists(target):
+            raise ValueError(f"Fork output {section}.{key} '{target}' already exists; choose another branch")
+    for (section, key), target in moved.items():
+        config[section] = {**config[section], key: target}
+    system.reopen_outputs(moved.get(('metrics', 'stream_path')), moved.get(('trajectory', 'spill_dir')))
+    if seed is not None:
+        system.rng = RNGService(seed)
+        if system.controller.planner is not None:
+            system.controller.planner.rng = system.rng
+    return system
@@ -0,0 +1,277 @@
+# simulation/event_engine.py
+import heapq
+import math
+import numpy as np
+from models.energy_model import EnergyModel
+from models.threat_pool import ThreatPool
+from mpc.patrol_planner import patrol_paths
+from simulation.scenario import Scenario
+
+THREAT_ARRIVAL = 'threat_arrival'
+WAYPOINT = 'waypoint'
+TASK_ARRIVAL = 'task_arrival'
+TASK_DONE = 'task_done'
+BATTERY_LOW = 'battery_low'
+
+
+class EventDrivenSystem:
+    """Discrete-event counterpart of DecentralizedUAVSystem.
+
+    Time is continuous, with one unit per slot. Nothing is stepped. A heap of
+    timestamped events is popped in order and each handler schedules the
+    events that follow from it. The event kinds are:
+    - threat arrivals, a Poisson stream at threats.spawn_frequency per slot;
+    - UAV waypoint arrivals along the patrol tours, `events.dwell` slots apart plus flight time;
+    - device task arrivals at events.task_rate per device per slot;
+    - task completions, served FIFO per UAV at events.service_rate MB/slot;
+    - UAV battery-threshold crossings.
+
+    Threats move in straight lines toward the border at their mean slotted
+    speed, so their positions are only evaluated when a UAV arrives
+    somewhere. UAV energy is piecewise linear (events.hover_drain per slot)
+    and device energy only changes when a task is served.
+
+    Run time is therefore proportional to the number of events, not to
+    duration x entities. run_simulation() still returns per-slot
+    energy_efficiency / total_energy / threats_handled lists, like the
+    slotted engine. Events falling in [t, t + 1) count toward slot t, and
+    energy is sampled at each slot boundary.
+    """
+
+    def __init__(self, config, seed=None):
+        self.scenario = scenario = Scenario.from_config(config)
+        if isinstance(config, Scenario):
+            config = scenario.to_config()
+        self.config = config
+        self.mode = scenario.mode
+        self.area_size = scenario.area_size
+        self.time_slots = scenario.time_slots
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+        events = config.get('events', {})
+        self.task_rate = events.get('task_rate', 1.0)
+        self.service_rate = events.get('service_rate', 100.0)
+        self.hover_drain = events.get('hover_drain', 0.0)
+        self.battery_threshold = events.get('battery_threshold', 0.0)
+        # UAVs hover `dwell` slots at each waypoint; uav_speed None makes the legs instantaneous,
+        # so the default visits one waypoint per slot like the slotted engine
+        self.uav_speed = events.get('uav_speed')
+        self.dwell = events.get('dwell', 1.0)
+        self.service_range = scenario.uav.service_range
+        self.service_range_sq = scenario.uav.service_range_sq
+        self.energy_reserve = scenario.offloading.energy_reserve
+        self.energy_model = EnergyModel.from_config(config)
+        self.consumption = scenario.offloading.consumption_per_slot
+
+        # Same border layout as the slotted engine
+        D = scenario.iot.device_count
+        i = np.arange(D)
+        self.device_pos = np.empty((D, 2))
+        self.device_pos[:, 0] = np.clip((i * self.area_size / D).astype(int), 0, self.area_size - 1)
+        self.device_pos[:, 1] = np.clip(
+            (self.area_size // 2 + 10 * np.sin(i / 15.0) + rng.integers(-2, 3, size=D)).astype(int),
+            0, self.area_size - 1)
+        self.device_energy = rng.uniform(*scenario.iot.battery_range, size=D)
+
+        U = scenario.uav.count
+        self.uav_pos = np.column_stack([
+            [int(self.area_size * (j + 1) / (U + 1)) for j in range(U)],
+            np.full(U, self.area_size // 2)]).astype(float)
+        # Energy is uav_energy - hover_drain * (t - uav_clock), clamped at zero
+        self.uav_energy = np.full(U, float(scenario.uav.battery))
+        self.uav_clock = np.zeros(U)
+        self.uav_busy_until = np.zeros(U)
+        self.uav_grounded = np.zeros(U, dtype=bool)
+        self.uav_version = np.zeros(U, dtype=np.int64)  # invalidates stale battery events
+        self.patrol = patrol_paths(config, self.device_pos, self.uav_pos)
+        self.waypoint = np.zeros(U, dtype=np.int64)
+        # Patrol legs never change, so their flight costs are tabulated once per tour
+        self.leg_cost = [self.energy_model.leg_costs(path) for path in self.patrol]
+        self.first_leg_cost = np.array([self.energy_model.cost(distance=np.hypot(*(path[0] - start)))
+                                        for path, start in zip(self.patrol, self.uav_pos)])
+
+        self.spawn_rate = scenario.spawn_rate
+        initial = scenario.initial_threats
+        pool_capacity = scenario.threats.pool_capacity  # A fixed cap when set; otherwise the pool grows
+        capacity = pool_capacity or ThreatPool.default_capacity(initial, self.spawn_rate, self.time_slots)
+        self.threat_pool = ThreatPool(capacity, self.area_size, growable=pool_capacity is None)
+        self.threat_born = np.zeros(capacity)
+        self.threat_velocity = np.zeros(capacity)
+
+        self.metrics = {
+            'energy_efficiency': [],
+            'total_energy': [],
+            'threats_handled': []
+        }
+        self.slot_served = np.zeros(self.time_slots, dtype=np.int64)
+        self.slot_neutralized = np.zeros(self.time_slots, dtype=np.int64)
+        self.slot_completed_mb = np.zeros(self.time_slots)
+        self.closed_slots = 0
+        self.now = 0.0
+        self.events_processed = {}
+
+        self.queue = []
+        self._seq = 0
+        self._spawn_threats(0.0, initial)
+        if self.spawn_rate:
+            self.schedule(rng.exponential(1.0 / self.spawn_rate), THREAT_ARRIVAL)
+        for j in range(U):
+            self.schedule(0.0, WAYPOINT, j)
+        if self.task_rate > 0:
+            for d, at in enumerate(rng.exponential(1.0 / self.task_rate, size=D)):
+                self.schedule(at, TASK_ARRIVAL, d)
+        for j in range(U):
+            self._schedule_battery(j)
+
+    def schedule(self, time, kind, payload=None, version=None):
+        if time < self.time_slots:
+            heapq.heappush(self.queue, (time, self._seq, kind, payload, version))
+            self._seq += 1
+
+    def run_simulation(self):
+        handlers = {
+            THREAT_ARRIVAL: self._on_threat_arrival,
+            WAYPOINT: self._on_waypoint,
+            TASK_ARRIVAL: self._on_task_arrival,
+            TASK_DONE: self._on_task_done,
+            BATTERY_LOW: self._on_battery_low,
+        }
+        while self.queue:
+            time, _, kind, payload, version = heapq.heappop(self.queue)
+            if kind == BATTERY_LOW and version != self.uav_version[payload]:
+                continue
+            self._close_slots(time)
+            self.now = time
+            self.events_processed[kind] = self.events_processed.get(kind, 0) + 1
+            handlers[kind](payload)
+        self._close_slots(self.time_slots)
+        return self.metrics
+
+    # --- energy bookkeeping -------------------------------------------------
+
+    def energy_at(self, time):
+        return np.maximum(self.uav_energy - self.hover_drain * (time - self.uav_clock), 0.0)
+
+    def _spend(self, j, amount):
+        self.uav_energy[j] = self.energy_at(self.now)[j] - amount
+        self.uav_clock[j] = self.now
+        self.uav_version[j] += 1
+        self._schedule_battery(j)
+
+    def _schedule_battery(self, j):
+        if self.uav_grounded[j]:
+            return
+        margin = self.uav_energy[j] - self.battery_threshold
+        if margin <= 0:
+            self.schedule(self.now, BATTERY_LOW, j, self.uav_version[j])
+        elif self.hover_drain > 0:
+            self.schedule(self.uav_clock[j] + margin / self.hover_drain, BATTERY_LOW, j, self.uav_version[j])
+
+    def _close_slots(self, time):
+        """Emit metrics for every slot that ends at or before `time`."""
+        upto = min(int(math.floor(time)), self.time_slots)
+        if upto <= self.closed_slots:
+            return
+        # Device energy is constant between events and UAV energy linear, so a
+        # stretch of idle slots closes in one vectorized step
+        ends = np.arange(self.closed_slots + 1, upto + 1, dtype=float)
+        uav = np.maximum(self.uav_energy - self.hover_drain * (ends[:, None] - self.uav_clock), 0.0)
+        energy_spent = self.device_energy.sum() + uav.sum(axis=1)
+        served = self.slot_served[self.closed_slots:upto]
+        positive = energy_spent > 0
+        efficiency = np.where(positive, served / np.where(positive, energy_spent, 1.0), 0.0)
+        self.metrics['energy_efficiency'].extend(efficiency.tolist())
+        self.metrics['total_energy'].extend(energy_spent.tolist())
+        self.metrics['threats_handled'].extend(self.slot_neutralized[self.closed_slots:upto].tolist())
+        self.closed_slots = upto
+
+    # --- handlers -----------------------------------------------------------
+
+    def _spawn_threats(self, time, n):
+        pool = self.threat_pool
+        slots = pool.spawn(self._sample_threats(n))
+        if len(self.threat_born) < pool.capacity:  # The pool grew
+            grown = pool.capacity - len(self.threat_born)
+            self.threat_born = np.concatenate([self.threat_born, np.zeros(grown)])
+            self.threat_velocity = np.concatenate([self.threat_velocity, np.zeros(grown)])
+        middle = self.area_size // 2
+        # Mean slotted speed: 1-3 units toward the border, no net sideways drift
+        self.threat_velocity[slots] = np.where(pool.state.pos[slots, 1] > middle, -2.0, 2.0)
+        self.threat_born[slots] = time
+
+    def _sample_threats(self, n):
+        middle = self.area_size // 2
+        bottom = self.rng.random(n) < 0.5
+        x = self.rng.integers(0, self.area_size, size=n)
+        y = np.where(bottom, self.rng.integers(middle - 20, middle - 10, size=n),
+                     self.rng.integers(middle + 10, middle + 20, size=n))
+        return np.column_stack([x, y]).astype(float)
+
+    def threat_positions(self, slots, time):
+        """Positions of pool `slots` at `time`; threats stop once they reach the border line."""
+        pos = self.threat_pool.state.pos[slots].copy()
+        middle = self.area_size // 2
+        travel = self.threat_velocity[slots] * (time - self.threat_born[slots])
+        to_border = middle - pos[:, 1]
+        pos[:, 1] += np.where(np.abs(travel) < np.abs(to_border), travel, to_border)
+        return pos
+
+    def _on_threat_arrival(self, _):
+        self._spawn_threats(self.now, 1)
+        self.schedule(self.now + self.rng.exponential(1.0 / self.spawn_rate), THREAT_ARRIVAL)
+
+    def _on_waypoint(self, j):
+        if self.uav_grounded[j]:
+            return
+        path = self.patrol[j]
+        target = path[self.waypoint[j] % len(path)]
+        k = self.waypoint[j]
+        self.uav_pos[j] = target
+        self._spend(j, float(self.leg_cost[j][k % len(path)] if k else self.first_leg_cost[j]))
+
+        pool = self.threat_pool
+        live = np.flatnonzero(pool.live)
+        if len(live):
+            diff = self.threat_positions(live, self.now) - target
+            hit = live[np.einsum('ij,ij->i', diff, diff) <= self.service_range ** 2]
+            if len(hit):
+                pool.state.neutralized[hit] = True
+                pool.retire(pool.state.neutralized[:pool.capacity])
+                self.slot_neutralized[int(self.now)] += len(hit)
+
+        self.waypoint[j] += 1
+        following = path[self.waypoint[j] % len(path)]
+        travel = float(np.hypot(*(following - target))) / self.uav_speed if self.uav_speed else 0.0
+        self.schedule(self.now + max(self.dwell + travel, 1e-9), WAYPOINT, j)
+
+    def _on_task_arrival(self, d):
+        self.schedule(self.now + self.rng.exponential(1.0 / self.task_rate), TASK_ARRIVAL, d)
+        diff = self.uav_pos - self.device_pos[d]
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
+        energy = self.energy_at(self.now)
+        feasible = (dist_sq <= self.service_range_sq) & ~self.uav_grounded
+        if self.scenario.offloading_enabled:
+            data_size = int(self.rng.integers(10, 100))  # in MB
+            # Gate on the energy the task will actually be charged, as assign_batch does
+            task_energy = float(self.energy_model.task_costs(data_size))
+            left = energy - task_energy
+            feasible &= (left >= self.energy_reserve) & (left > self.battery_threshold)
+        if not feasible.any():
+            return
+        # Same cost as OffloadingManager.assign_task
+        j = int(np.argmin(np.where(feasible, dist_sq + (100 - energy), np.inf)))
+        self.device_energy[d] = max(self.device_energy[d] - self.consumption, 0.0)
+        self.slot_served[int(self.now)] += 1
+        if self.scenario.offloading_enabled:  # Don't offload in MPC-only
+            start = max(self.now, self.uav_busy_until[j])
+            self.uav_busy_until[j] = start + data_size / self.service_rate
+            self.schedule(self.uav_busy_until[j], TASK_DONE, (j, data_size))
+            self._spend(j, task_energy)
+
+    def _on_task_done(self, payload):
+        _, data_size = payload
+        self.slot_completed_mb[int(self.now)] += data_size
+
+    def _on_battery_low(self, j):
+        # Grounded UAVs stop patrolling and accepting work; queued tasks still finish
+        self.uav_grounded[j] = True
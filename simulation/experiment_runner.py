@@ -0,0 +1,117 @@
+# simulation/experiment_runner.py
+import os
+import zlib
+from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation.simulation_manager import DecentralizedUAVSystem
+from simulation.batched_system import BatchedUAVSystem
+from simulation.event_engine import EventDrivenSystem
+from simulation.agent_runtime import AgentRuntime
+from simulation.sharded_system import ShardedBorderSystem
+from simulation.scenario import Scenario
+
+
+def job_seed(base_seed, mode, run):
+    """Independent SeedSequence for one (mode, run) pair, stable across processes."""
+    return np.random.SeedSequence(base_seed, spawn_key=(zlib.crc32(mode.lower().encode()), run))
+
+
+def system_seed(seed):
+    """The engine seed run_seeded derives from the SeedSequence `seed`."""
+    return int(seed.generate_state(4)[2])
+
+
+def run_seeded(config, seed):
+    """Run one simulation with every RNG it touches derived from the SeedSequence `seed`."""
+    engine = Scenario.from_config(config).engine  # Fails fast on an invalid config
+    if engine == 'events':
+        return EventDrivenSystem(config, seed=system_seed(seed)).run_simulation()
+    if engine == 'sharded':
+        return ShardedBorderSystem(config, seed=system_seed(seed)).run_simulation()
+    system = DecentralizedUAVSystem(config, seed=system_seed(seed))
+    if engine == 'agents':
+        return AgentRuntime(system).run_simulation()
+    return system.run_simulation()
+
+
+def _run_job(job):
+    mode, run, config, seed = job
+    return mode, run, run_seeded(config, seed)
+
+
+def _run_batched_job(job):
+    mode, runs, config, seed = job
+    return mode, BatchedUAVSystem(config, replicas=runs, seed=seed).run_simulation()
+
+
+def resolve_workers(config, workers=None):
+    if workers is None:
+        workers = config.get('experiments', {}).get('workers')
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def run_experiments(base_config, modes, runs=10, workers=None, base_seed=None, batched=None):
+    """Run every (mode, seed) replication, spread over a process pool.
+
+    Returns {mode: [metrics of run 0, run 1, ...]} in run order, so any
+    reduction over it is independent of worker count and completion order.
+    With batched=True (or experiments.batched) all runs of a mode advance
+    together in one BatchedUAVSystem and the pool spreads modes instead.
+    """
+    if base_seed is None:
+        base_seed = base_config.get('experiments', {}).get('seed', 0)
+    if batched is None:
+        batched = base_config.get('experiments', {}).get('batched', False)
+    workers = resolve_workers(base_config, workers)
+    if batched:
+        return _run_batched(base_config, modes, runs, workers, base_seed)
+
+    jobs = []
+    for mode in modes:
+        for run in range(runs):
+            config = deepcopy(base_config)
+            config['mode'] = mode.lower()
+            jobs.append((mode, run, config, job_seed(base_seed, mode, run)))
+
+    if workers == 1:
+        outputs = list(map(_run_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_run_job, jobs))
+
+    results = {mode: [None] * runs for mode in modes}
+    for mode, run, metrics in outputs:
+        results[mode][run] = metrics
+    return results
+
+
+def _run_batched(base_config, modes, runs, workers, base_seed):
+    jobs = []
+    for mode in modes:
+        config = deepcopy(base_config)
+        config['mode'] = mode.lower()
+        # Replica k gets the seed run k would get unbatched, so both draw the same streams
+        seeds = [system_seed(job_seed(base_seed, mode, run)) for run in range(runs)]
+        jobs.append((mode, runs, config, seeds))
+
+    if workers == 1 or len(jobs) == 1:
+        outputs = list(map(_run_batched_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            outputs = list(pool.map(_run_batched_job, jobs))
+    return dict(outputs)
+
+
+def average_runs(run_results):
+    """Element-wise mean over runs, accumulated in run order."""
+    accumulated = {}
+    for result in run_results:
+        for key, values in result.items():
+            if key not in accumulated:
+                accumulated[key] = [0.0] * len(values)
+            for i, value in enumerate(values):
+                accumulated[key][i] += float(value)
+    return {key: [val / len(run_results) for val in values] for key, values in accumulated.items()}
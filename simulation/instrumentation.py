@@ -0,0 +1,143 @@
+# simulation/instrumentation.py
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+
+class MemorySink:
+    """Keeps every slot record in a list."""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Appends one JSON object per slot to a file."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a')
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class _Phase:
+    __slots__ = ('owner', 'name', 'wall', 'cpu')
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        phases = self.owner.record['phases']
+        wall = (time.perf_counter() - self.wall) * 1000.0
+        cpu = (time.process_time() - self.cpu) * 1000.0
+        entry = phases.setdefault(self.name, {'wall_ms': 0.0, 'cpu_ms': 0.0})
+        entry['wall_ms'] += wall
+        entry['cpu_ms'] += cpu
+        return False
+
+
+class Instrumentation:
+    """Per-slot, per-phase timers and counters written to a pluggable sink.
+
+    Slots inside `profile_slots` (a [start, stop) pair) additionally run
+    under cProfile, dumped to `profile_path`, and tracemalloc, whose peak is
+    added to each record of the window.
+    """
+
+    enabled = True
+
+    def __init__(self, sink=None, profile_slots=None, profile_path='results/profile.pstats'):
+        self.sink = sink if sink is not None else MemorySink()
+        self.profile_slots = profile_slots
+        self.profile_path = profile_path
+        self.profiler = None
+        self.record = None
+
+    @classmethod
+    def from_config(cls, config):
+        settings = config.get('instrumentation', {})
+        if not settings.get('enabled', False):
+            return NullInstrumentation()
+        sink = JsonLinesSink(settings['path']) if settings.get('sink') == 'jsonl' else MemorySink()
+        return cls(sink, settings.get('profile_slots'),
+                   settings.get('profile_path', 'results/profile.pstats'))
+
+    def begin_slot(self, t):
+        self.record = {'slot': t, 'phases': {}, 'counters': {}}
+        if self.profile_slots and t == self.profile_slots[0]:
+            tracemalloc.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def count(self, name, n=1):
+        counters = self.record['counters']
+        counters[name] = counters.get(name, 0) + n
+
+    def end_slot(self):
+        record, t = self.record, self.record['slot']
+        if self.profiler is not None:
+            record['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            if t == self.profile_slots[1] - 1:
+                self._stop_profile()
+        self.sink.write(record)
+        self.record = None
+
+    def _stop_profile(self):
+        self.profiler.disable()
+        os.makedirs(os.path.dirname(self.profile_path) or '.', exist_ok=True)
+        self.profiler.dump_stats(self.profile_path)
+        self.profiler = None
+        tracemalloc.stop()
+
+    def close(self):
+        """Stop a profile window the run ended inside, then flush and close the sink."""
+        if self.profiler is not None:
+            self._stop_profile()
+        self.sink.close()
+
+
+class NullInstrumentation:
+    """Disabled instrumentation: every hook is a no-op."""
+
+    enabled = False
+    _phase = nullcontext()
+
+    def begin_slot(self, t):
+        pass
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, n=1):
+        pass
+
+    def end_slot(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,128 @@
+# simulation/metrics_stream.py
+import json
+import os
+import time
+import numpy as np
+
+
+class MetricsStream:
+    """Append-only columnar store for per-slot metric records.
+
+    Records (dicts of scalars or fixed-length 1-D arrays) are buffered and
+    written `batch_size` at a time, one raw little-endian file per column
+    plus a schema.json describing dtypes and row shapes. Memory use stays
+    constant no matter how many slots are written, and the files can be
+    read or followed by another process while the run is still going.
+    """
+
+    def __init__(self, path, batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        self.schema = None
+        self.buffer = []
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, record):
+        if self.schema is None:
+            self._write_schema(record)
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def _write_schema(self, record):
+        self.schema = {}
+        for name, value in record.items():
+            value = np.asarray(value)
+            kind = np.dtype(np.int64 if value.dtype.kind in 'iub' else np.float64)
+            self.schema[name] = {'dtype': kind.newbyteorder('<').str, 'shape': list(value.shape)}
+        for name in self.schema:
+            open(self._column_path(self.path, name), 'wb').close()
+        with open(os.path.join(self.path, 'schema.json'), 'w') as f:
+            json.dump(self.schema, f)
+
+    @staticmethod
+    def _column_path(path, name):
+        return os.path.join(path, f'{name}.bin')
+
+    def flush(self):
+        if not self.buffer:
+            return
+        for name, spec in self.schema.items():
+            column = np.asarray([record[name] for record in self.buffer], dtype=spec['dtype'])
+            with open(self._column_path(self.path, name), 'ab') as f:
+                column.tofile(f)
+        self.rows += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __getstate__(self):
+        # Checkpoints record how many rows are on disk; pending ones are written first
+        self.flush()
+        return self.__dict__.copy()
+
+    def reopen(self, path=None):
+        """Reattach to the files after a checkpoint load, keeping only the rows written before it.
+
+        By default the rows the original process wrote after the checkpoint
+        are dropped in place. With a new `path` the checkpointed rows are
+        copied there instead and the original files are left untouched.
+        """
+        source = self.path
+        if path is not None:
+            self.path = path
+            os.makedirs(path, exist_ok=True)
+        if self.schema is None:
+            return
+        for name, spec in self.schema.items():
+            row_bytes = np.dtype(spec['dtype']).itemsize * int(np.prod(spec['shape'], dtype=np.int64))
+            size = self.rows * row_bytes
+            if self.path == source:
+                with open(self._column_path(self.path, name), 'r+b') as f:
+                    f.truncate(size)
+            else:
+                with open(self._column_path(source, name), 'rb') as f:
+                    data = f.read(size)
+                with open(self._column_path(self.path, name), 'wb') as f:
+                    f.write(data)
+        if self.path != source:
+            with open(os.path.join(self.path, 'schema.json'), 'w') as f:
+                json.dump(self.schema, f)
+
+    @staticmethod
+    def read(path):
+        """Memory-map every column written so far as {name: array of shape (rows, ...)}."""
+        with open(os.path.join(path, 'schema.json')) as f:
+            schema = json.load(f)
+        sizes = {}
+        for name, spec in schema.items():
+            row_bytes = np.dtype(spec['dtype']).itemsize * int(np.prod(spec['shape'], dtype=np.int64))
+            sizes[name] = os.path.getsize(MetricsStream._column_path(path, name)) // row_bytes
+        rows = min(sizes.values()) if sizes else 0  # a concurrent writer may be mid-batch
+        columns = {}
+        for name, spec in schema.items():
+            shape = (rows,) + tuple(spec['shape'])
+            if rows == 0:
+                columns[name] = np.empty(shape, dtype=spec['dtype'])
+            else:
+                columns[name] = np.memmap(MetricsStream._column_path(path, name), dtype=spec['dtype'],
+                                          mode='r', shape=shape)
+        return columns
+
+    @staticmethod
+    def follow(path, poll=0.5, stop=None):
+        """Yield records from `path` as they are flushed; ends once `stop()` is true and all are read."""
+        seen = 0
+        while True:
+            done = stop is not None and stop()
+            if os.path.exists(os.path.join(path, 'schema.json')):
+                columns = MetricsStream.read(path)
+                total = len(next(iter(columns.values()))) if columns else 0
+                for i in range(seen, total):
+                    yield {name: column[i] for name, column in columns.items()}
+                seen = total
+            if done:
+                return
+            time.sleep(poll)
@@ -0,0 +1,400 @@
+# simulation/reporting.py
+"""Figure generation for simulation results.
+
+matplotlib is imported only when a figure is actually drawn and defaults to
+the non-interactive Agg backend (set MPLBACKEND to override), so batch jobs
+never block on a GUI. render_report() redraws the whole figure set from a
+saved JSON file, spreading the figures over worker processes.
+"""
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MODE_COLORS = {
+    'PURE': 'green',
+    'ECOP': 'skyblue',
+    'MPC-ONLY': 'orange'
+}
+
+NON_INTERACTIVE = {'agg', 'pdf', 'ps', 'svg', 'pgf', 'cairo', 'template'}
+
+
+def pyplot():
+    """Import pyplot on first use, selecting Agg unless MPLBACKEND says otherwise."""
+    import matplotlib
+    if 'MPLBACKEND' not in os.environ and 'matplotlib.pyplot' not in sys.modules:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _box_labels(plt, labels):
+    # boxplot's labels= keyword was renamed across matplotlib releases
+    plt.xticks(range(1, len(labels) + 1), labels)
+
+
+def _finish(plt):
+    if plt.get_backend().lower() not in NON_INTERACTIVE:
+        plt.show()
+    plt.close('all')
+
+
+def plot_comparisons(results_dict):
+    plt = pyplot()
+    time_slots = list(range(len(next(iter(results_dict.values()))['energy_efficiency'])))
+    os.makedirs("results", exist_ok=True)
+
+    colors = {
+        'PURE': 'green',
+        'ECOP': 'skyblue',
+        'MPC-ONLY': 'orange'
+    }
+
+    # --- Energy Efficiency ---
+    plt.figure(figsize=(8, 5))
+    for label, res in results_dict.items():
+        plt.plot(
+            time_slots,
+            res['energy_efficiency'],
+            label=label,
+            color=colors.get(label.upper(), 'black'),
+            linestyle='--'
+        )
+    plt.xlabel("Time Slot")
+    plt.ylabel("Mb/Joule")
+    plt.title("Energy Efficiency over Time")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig("results/comparison_energy_efficiency.png")
+    _finish(plt)
+
+    # --- Threats Neutralized ---
+    plt.figure(figsize=(8, 5))
+    for label, res in results_dict.items():
+        plt.plot(
+            time_slots,
+            res['threats_handled'],
+            label=label,
+            color=colors.get(label.upper(), 'black'),
+            linestyle='--'
+        )
+    plt.xlabel("Time Slot")
+    plt.ylabel("Threats")
+    plt.title("Threats Neutralized over Time")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig("results/comparison_threats_neutralized.png")
+    _finish(plt)
+
+    # --- Total Energy Consumption ---
+    plt.figure(figsize=(8, 5))
+    for label, res in results_dict.items():
+        plt.plot(
+            time_slots,
+            res['total_energy'],
+            label=label,
+            color=colors.get(label.upper(), 'black'),
+            linestyle='--'
+        )
+    plt.xlabel("Time Slot")
+    plt.ylabel("Energy (J)")
+    plt.title("Total Energy Consumption over Time")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig("results/comparison_energy_consumed.png")
+    _finish(plt)
+
+
+def plot_grouped_bar_charts(results_dict):
+    plt = pyplot()
+    os.makedirs("results", exist_ok=True)
+
+    modes = list(results_dict.keys())
+    time_slots = list(range(len(next(iter(results_dict.values()))['energy_efficiency'])))
+    num_slots = len(time_slots)
+    num_modes = len(modes)
+    
+    bar_width = 0.25
+    x = np.arange(num_slots)  # Time slot positions
+
+    colors = {
+        'PURE': 'green',
+        'ECOP': 'skyblue',
+        'MPC-ONLY': 'orange'
+    }
+
+    # Plot 1: Threats Neutralized per Time Slot
+    plt.figure(figsize=(10, 5))
+    for idx, mode in enumerate(modes):
+        values = results_dict[mode]['threats_handled']
+        plt.bar(x + idx * bar_width, values, width=bar_width, label=mode, color=colors[mode])
+    plt.xlabel("Time Slot")
+    plt.ylabel("Threats Neutralized")
+    plt.title("Threats Neutralized per Time Slot")
+    plt.xticks(x + bar_width, time_slots)
+    plt.legend()
+    plt.grid(axis='y')
+    plt.tight_layout()
+    plt.savefig("results/grouped_threats.png")
+    _finish(plt)
+
+    # Plot 2: Energy Efficiency per Time Slot
+    plt.figure(figsize=(10, 5))
+    for idx, mode in enumerate(modes):
+        values = results_dict[mode]['energy_efficiency']
+        plt.bar(x + idx * bar_width, values, width=bar_width, label=mode, color=colors[mode])
+    plt.xlabel("Time Slot")
+    plt.ylabel("Energy Efficiency (Mb/J)")
+    plt.title("Energy Efficiency per Time Slot")
+    plt.xticks(x + bar_width, time_slots)
+    plt.legend()
+    plt.grid(axis='y')
+    plt.tight_layout()
+    plt.savefig("results/grouped_efficiency.png")
+    _finish(plt)
+
+
+def plot_threat_scaling(threat_counts, efficiency_vals, neutralized_vals):
+    plt = pyplot()
+    os.makedirs("results", exist_ok=True)
+
+    # Plot 1: Energy Efficiency vs Threat Count
+    plt.figure(figsize=(8, 5))
+    plt.plot(threat_counts, efficiency_vals, marker='o',linestyle='--', color='green')
+    plt.title("Energy Efficiency vs Number of Threats (PURE Model)")
+    plt.xlabel("Number of Threats")
+    plt.ylabel("Avg Energy Efficiency (Mb/J)")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig("results/PURE_efficiency_vs_threats.png")
+    _finish(plt)
+
+    # Plot 2: Threats Neutralized vs Total Threats
+    plt.figure(figsize=(8, 5))
+    plt.plot(threat_counts, neutralized_vals, marker='s',linestyle='--', color='green')
+    plt.title("Threats Neutralized vs Number of Threats (PURE Model)")
+    plt.xlabel("Number of Threats")
+    plt.ylabel("Total Neutralized")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig("results/PURE_neutralized_vs_threats.png")
+    _finish(plt)
+
+
+def plot_bar_comparisons(results_dict):
+    plt = pyplot()
+    os.makedirs("results", exist_ok=True)
+
+    # Extract means
+    modes = list(results_dict.keys())
+    avg_efficiency = [sum(res['energy_efficiency']) / len(res['energy_efficiency']) for res in results_dict.values()]
+    avg_threats = [sum(res['threats_handled']) / len(res['threats_handled']) for res in results_dict.values()]
+
+    # Plot Average Energy Efficiency
+    plt.figure(figsize=(6, 4))
+    plt.bar(modes, avg_efficiency, color=['green', 'skyblue', 'orange'])
+    plt.title("Average Energy Efficiency")
+    plt.ylabel("Mb per Joule")
+    plt.grid(axis='y')
+    plt.tight_layout()
+    plt.savefig("results/avg_energy_efficiency.png")
+    _finish(plt)
+
+    # Plot Average Threats Neutralized
+    plt.figure(figsize=(6, 4))
+    plt.bar(modes, avg_threats, color=['green', 'skyblue', 'orange'])
+    plt.title("Average Threats Neutralized")
+    plt.ylabel("Number of Threats")
+    plt.grid(axis='y')
+    plt.tight_layout()
+    plt.savefig("results/avg_threats_neutralized.png")
+    _finish(plt)
+
+
+def plot_boxplots(results_dict):
+    plt = pyplot()
+    os.makedirs("results", exist_ok=True)
+
+    # Box Plot: Threats Neutralized
+    plt.figure(figsize=(7, 5))
+    data = [res['threats_handled'] for res in results_dict.values()]
+    labels = list(results_dict.keys())
+    plt.boxplot(data, patch_artist=True,
+                boxprops=dict(facecolor='lightblue'))
+    _box_labels(plt, labels)
+    plt.title("Threats Neutralized per Time Slot")
+    plt.ylabel("Number of Threats")
+    plt.grid(True)
+    plt.savefig("results/threats_boxplot.png")
+    _finish(plt)
+
+    # Box Plot: Energy Efficiency
+    plt.figure(figsize=(7, 5))
+    data = [res['energy_efficiency'] for res in results_dict.values()]
+    plt.boxplot(data, patch_artist=True,
+                boxprops=dict(facecolor='lightgreen'))
+    _box_labels(plt, labels)
+    plt.title("Energy Efficiency per Time Slot")
+    plt.ylabel("Mb per Joule")
+    plt.grid(True)
+    plt.savefig("results/efficiency_boxplot.png")
+    _finish(plt)
+
+
+def plot_threat_sweep(results_dict):
+    plt = pyplot()
+    os.makedirs("results", exist_ok=True)
+    time_slots = list(range(len(next(iter(results_dict.values()))['energy_efficiency'])))
+
+    # Energy Efficiency Plot
+    plt.figure(figsize=(10, 5))
+    for count, res in results_dict.items():
+        plt.plot(time_slots, res['energy_efficiency'], label=f'{count} Threats')
+    plt.title("Energy Efficiency vs Time for Varying Threat Counts")
+    plt.xlabel("Time Slot")
+    plt.ylabel("Mb per Joule")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig("results/threatsweep_efficiency.png")
+    _finish(plt)
+
+    # Threat Neutralization Plot
+    plt.figure(figsize=(10, 5))
+    for count, res in results_dict.items():
+        plt.plot(time_slots, res['threats_handled'], label=f'{count} Threats')
+    plt.title("Threats Neutralized vs Time")
+    plt.xlabel("Time Slot")
+    plt.ylabel("Number Neutralized")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig("results/threatsweep_neutralized.png")
+    _finish(plt)
+
+
+def plot_threats_line(results_dict, time_slots, modes, colors):
+    plt = pyplot()
+    plt.figure(figsize=(10, 5))
+    for mode in modes:
+        values = results_dict[mode]['threats_handled']
+        plt.plot(time_slots, values, label=mode, marker='o', linewidth=2,linestyle='--', color=colors[mode])
+
+    plt.xlabel("Time Slot")
+    plt.ylabel("Threats Neutralized")
+    plt.title("Threats Neutralized Over Time")
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig("results/threats_lineplot.png")
+    _finish(plt)
+
+
+def plot_threats_summary_bar(results_dict, modes, colors):
+    plt = pyplot()
+    plt.figure(figsize=(8, 5))
+    totals = [sum(results_dict[mode]['threats_handled']) for mode in modes]
+    plt.bar(modes, totals, color=[colors[mode] for mode in modes])
+    plt.ylabel("Total Threats Neutralized")
+    plt.title("Total Threats Neutralized per Strategy")
+    plt.tight_layout()
+    plt.savefig("results/threats_total_bar.png")
+    _finish(plt)
+
+
+def plot_threats_boxplot(results_dict, modes, colors):
+    plt = pyplot()
+    plt.figure(figsize=(8, 5))
+    data = [results_dict[mode]['threats_handled'] for mode in modes]
+    box = plt.boxplot(data, patch_artist=True)
+    _box_labels(plt, modes)
+    
+    for patch, mode in zip(box['boxes'], modes):
+        patch.set_facecolor(colors[mode])
+        
+    plt.ylabel("Threats Neutralized")
+    plt.title("Distribution of Threat Neutralization")
+    plt.grid(True, axis='y', linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    plt.savefig("results/threats_boxplot.png")
+    _finish(plt)
+
+
+def save_report_data(path, comparison=None, threat_sweep=None, threat_scaling=None):
+    """Write the inputs of every figure to one JSON file for render_report()."""
+    payload = {}
+    if comparison is not None:
+        payload['comparison'] = comparison
+    if threat_sweep is not None:
+        payload['threat_sweep'] = {str(count): res for count, res in threat_sweep.items()}
+    if threat_scaling is not None:
+        threat_counts, efficiency_vals, neutralized_vals = threat_scaling
+        payload['threat_scaling'] = {
+            'threat_counts': list(threat_counts),
+            'efficiency': [float(v) for v in efficiency_vals],
+            'neutralized': [float(v) for v in neutralized_vals],
+        }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, default=float)
+
+
+def _figure_jobs(data):
+    jobs = []
+    comparison = data.get('comparison')
+    if comparison:
+        modes = list(comparison.keys())
+        time_slots = list(range(len(next(iter(comparison.values()))['threats_handled'])))
+        colors = {mode: MODE_COLORS.get(mode, 'black') for mode in modes}
+        jobs += [
+            [('plot_comparisons', (comparison,))],
+            [('plot_grouped_bar_charts', (comparison,))],
+            [('plot_bar_comparisons', (comparison,))],
+            # Both write results/threats_boxplot.png, so keep their original order in one job
+            [('plot_boxplots', (comparison,)), ('plot_threats_boxplot', (comparison, modes, colors))],
+            [('plot_threats_line', (comparison, time_slots, modes, colors))],
+            [('plot_threats_summary_bar', (comparison, modes, colors))],
+        ]
+    if data.get('threat_sweep'):
+        jobs.append([('plot_threat_sweep', (data['threat_sweep'],))])
+    scaling = data.get('threat_scaling')
+    if scaling:
+        jobs.append([('plot_threat_scaling', (scaling['threat_counts'], scaling['efficiency'],
+                                              scaling['neutralized']))])
+    return jobs
+
+
+def _render_job(job):
+    for name, args in job:
+        globals()[name](*args)
+    return [name for name, _ in job]
+
+
+def render_report(path, workers=None):
+    """Draw every figure whose data is present in the JSON file at `path`."""
+    with open(path) as f:
+        data = json.load(f)
+    jobs = _figure_jobs(data)
+    if workers == 1 or len(jobs) <= 1:
+        done = [_render_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_render_job, jobs))
+    return [name for names in done for name in names]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Render all result figures from saved report data.')
+    parser.add_argument('path', nargs='?', default='results/report_data.json')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    for name in render_report(args.path, args.workers):
+        print(f"[REPORT] {name}")
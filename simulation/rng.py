@@ -0,0 +1,50 @@
+# simulation/rng.py
+import numpy as np
+
+# One independent stream per subsystem; the index is part of each stream's seed, so only append
+STREAMS = ('layout', 'energy', 'tasks', 'threats', 'planner', 'transport')
+URGENCY_LEVELS = np.array(['low', 'medium', 'high'])
+
+
+class RNGService:
+    """Per-subsystem numpy Generators derived from one seed.
+
+    stream(name) is the subsystem's generator for one-off draws such as
+    the layout. stream(name, t) is a fresh generator for slot t, keyed by
+    (subsystem, slot) rather than by how many draws came before. A slot's
+    draws are therefore the same whether the run is continuous, resumed
+    from a checkpoint or split across processes, and a subsystem drawing
+    more or less in one slot never shifts another's numbers. Each slot
+    draws whole arrays (one value per device, say) rather than scalars.
+    """
+
+    def __init__(self, seed=0):
+        if isinstance(seed, np.random.SeedSequence):
+            self.entropy, self.spawn_key = seed.entropy, tuple(seed.spawn_key)
+        else:
+            self.entropy, self.spawn_key = int(seed), ()
+        self.streams = {}
+
+    def _seed(self, name, *key):
+        if name not in STREAMS:
+            raise ValueError(f"Unknown RNG stream '{name}'; expected one of {STREAMS}")
+        return np.random.SeedSequence(self.entropy, spawn_key=self.spawn_key + (STREAMS.index(name), *key))
+
+    def stream(self, name, t=None, *parts):
+        """Generator for `name`; with `t` (and optional sub-keys such as a UAV id), a fresh one for that slot."""
+        if t is not None:
+            return np.random.default_rng(self._seed(name, int(t) + 1, *(int(p) for p in parts)))
+        if name not in self.streams:
+            self.streams[name] = np.random.default_rng(self._seed(name, 0))
+        return self.streams[name]
+
+    def energy_samples(self, t, n):
+        """Slot t's harvested-energy sample for each of n devices."""
+        return self.stream('energy', t).uniform(0.5, 3.0, size=n)
+
+    def tasks(self, t, n):
+        """Slot t's task data sizes (MB) and urgencies, one per device whether active or not."""
+        rng = self.stream('tasks', t)
+        data_size = rng.integers(10, 100, size=n)
+        urgency = URGENCY_LEVELS[rng.integers(0, len(URGENCY_LEVELS), size=n)]
+        return data_size, urgency
@@ -0,0 +1,386 @@
+# simulation/scenario.py
+import json
+import numbers
+from copy import deepcopy
+from dataclasses import MISSING, dataclass, field, fields, replace
+
+MODES = ('hybrid', 'pure', 'ecop', 'mpc-only')
+ENGINES = ('slotted', 'events', 'agents', 'sharded')
+GMM_ENGINES = ('sklearn', 'batched')
+URGENCIES = ('high', 'medium', 'low')
+MPC_PLANNERS = ('greedy', 'horizon')
+PATROL_PLANNERS = ('tour', 'segments')
+SPATIAL_INDEXES = ('grid', 'kdtree')
+SINKS = ('jsonl', 'memory')
+
+
+def _require(ok, key, message):
+    if not ok:
+        raise ValueError(f"Invalid config '{key}': {message}")
+
+
+def _positive(value, key, allow_zero=False):
+    _require(isinstance(value, numbers.Real) and not isinstance(value, bool), key, f"expected a number, got {value!r}")
+    _require(value >= 0 if allow_zero else value > 0, key,
+             f"must be {'non-negative' if allow_zero else 'positive'}, got {value!r}")
+
+
+def _count(value, key, allow_zero=False):
+    _require(isinstance(value, numbers.Integral) and not isinstance(value, bool), key,
+             f"expected an integer, got {value!r}")
+    _positive(value, key, allow_zero)
+
+
+def _choice(value, key, choices):
+    _require(value in choices, key, f"must be one of {choices}, got {value!r}")
+
+
+def _flag(value, key):
+    _require(isinstance(value, bool), key, f"expected true or false, got {value!r}")
+
+
+@dataclass(frozen=True, slots=True)
+class IoTSpec:
+    device_count: int
+    sensing_range: float
+    battery_range: tuple
+    sensing_range_sq: float = field(init=False, repr=False)
+
+    def __post_init__(self):
+        _count(self.device_count, 'iot.device_count')
+        _positive(self.sensing_range, 'iot.sensing_range')
+        _require(len(self.battery_range) == 2 and self.battery_range[0] <= self.battery_range[1],
+                 'iot.battery_range', f"expected [low, high], got {self.battery_range!r}")
+        object.__setattr__(self, 'battery_range', tuple(float(b) for b in self.battery_range))
+        object.__setattr__(self, 'sensing_range_sq', float(self.sensing_range) ** 2)
+
+
+@dataclass(frozen=True, slots=True)
+class UAVSpec:
+    battery: float
+    hover_time: float
+    service_range: float
+    count: int = 3
+    service_range_sq: float = field(init=False, repr=False)
+
+    def __post_init__(self):
+        _count(self.count, 'uav.count')
+        _positive(self.battery, 'uav.battery')
+        _positive(self.hover_time, 'uav.hover_time', allow_zero=True)
+        _positive(self.service_range, 'uav.service_range')
+        object.__setattr__(self, 'service_range_sq', float(self.service_range) ** 2)
+
+
+@dataclass(frozen=True, slots=True)
+class ThreatSpec:
+    count: int
+    spawn_frequency: float = 0
+    pool_capacity: int = None
+
+    def __post_init__(self):
+        _count(self.count, 'threats.count', allow_zero=True)
+        _positive(self.spawn_frequency, 'threats.spawn_frequency', allow_zero=True)
+        if self.pool_capacity is not None:
+            _count(self.pool_capacity, 'threats.pool_capacity')
+
+
+@dataclass(frozen=True, slots=True)
+class OffloadingSpec:
+    energy_threshold: float
+    consumption_per_slot: float
+    offload_cost: float = 0.5
+    uav_capacity: float = None
+    energy_reserve: float = 0.0
+    service_rate: float = 100.0
+    deadlines: tuple = ()
+
+    def __post_init__(self):
+        _positive(self.energy_threshold, 'offloading.energy_threshold', allow_zero=True)
+        _positive(self.consumption_per_slot, 'offloading.consumption_per_slot', allow_zero=True)
+        _positive(self.offload_cost, 'offloading.offload_cost', allow_zero=True)
+        if self.uav_capacity is not None:
+            _positive(self.uav_capacity, 'offloading.uav_capacity')
+        _positive(self.energy_reserve, 'offloading.energy_reserve', allow_zero=True)
+        _positive(self.service_rate, 'offloading.service_rate')
+        deadlines = dict(self.deadlines)
+        for urgency, slots in deadlines.items():
+            _require(urgency in URGENCIES, f'offloading.deadlines.{urgency}', f"urgency must be one of {URGENCIES}")
+            _positive(slots, f'offloading.deadlines.{urgency}')
+        object.__setattr__(self, 'deadlines', tuple(sorted(deadlines.items())))
+
+
+@dataclass(frozen=True, slots=True)
+class EnergySpec:
+    cruise_per_unit: float = 0.1
+    hover_per_slot: float = 0.0
+    payload_per_mb: float = 0.0
+
+    def __post_init__(self):
+        for name in ('cruise_per_unit', 'hover_per_slot', 'payload_per_mb'):
+            _positive(getattr(self, name), f'energy.{name}', allow_zero=True)
+
+
+@dataclass(frozen=True, slots=True)
+class GMMSpec:
+    history_window: int
+    engine: str = 'sklearn'
+    incremental: bool = False
+    drift_z: float = 3.0
+
+    def __post_init__(self):
+        _count(self.history_window, 'gmm.history_window')
+        _choice(self.engine, 'gmm.engine', GMM_ENGINES)
+        _flag(self.incremental, 'gmm.incremental')
+        _positive(self.drift_z, 'gmm.drift_z')
+
+
+@dataclass(frozen=True, slots=True)
+class MPCSpec:
+    planner: str = 'greedy'
+    horizon: int = 3
+    candidates: int = 64
+    chunk: int = 16
+    budget_ms: float = 20.0
+    discount: float = 0.9
+    threat_weight: float = 5.0
+    pool_size: int = 256
+    neighbours: int = 8
+
+    def __post_init__(self):
+        _choice(self.planner, 'mpc.planner', MPC_PLANNERS)
+        for name in ('horizon', 'candidates', 'chunk', 'pool_size', 'neighbours'):
+            _count(getattr(self, name), f'mpc.{name}')
+        _positive(self.budget_ms, 'mpc.budget_ms')
+        _positive(self.discount, 'mpc.discount')
+        _require(self.discount <= 1, 'mpc.discount', f"must be at most 1, got {self.discount!r}")
+        _positive(self.threat_weight, 'mpc.threat_weight', allow_zero=True)
+
+
+@dataclass(frozen=True, slots=True)
+class PatrolSpec:
+    planner: str = 'tour'
+    cache_dir: str = None
+    cache_entries: int = 64
+    max_passes: int = 50
+    max_points: int = 250
+
+    def __post_init__(self):
+        _choice(self.planner, 'patrol.planner', PATROL_PLANNERS)
+        _count(self.cache_entries, 'patrol.cache_entries')
+        _count(self.max_passes, 'patrol.max_passes', allow_zero=True)
+        _count(self.max_points, 'patrol.max_points', allow_zero=True)
+
+
+@dataclass(frozen=True, slots=True)
+class SpatialSpec:
+    index: str = 'grid'
+
+    def __post_init__(self):
+        _choice(self.index, 'spatial.index', SPATIAL_INDEXES)
+
+
+@dataclass(frozen=True, slots=True)
+class CheckpointSpec:
+    every: int = None
+    path: str = None
+
+    def __post_init__(self):
+        if self.every is not None:
+            _count(self.every, 'checkpoint.every')
+            _require(self.path is not None, 'checkpoint.path', "required when checkpoint.every is set")
+
+
+@dataclass(frozen=True, slots=True)
+class MetricsSpec:
+    keep_in_memory: bool = True
+    stream_path: str = None
+    batch_size: int = 256
+
+    def __post_init__(self):
+        _flag(self.keep_in_memory, 'metrics.keep_in_memory')
+        _count(self.batch_size, 'metrics.batch_size')
+
+
+@dataclass(frozen=True, slots=True)
+class TrajectorySpec:
+    capacity: int = None
+    spill_dir: str = None
+
+    def __post_init__(self):
+        if self.capacity is not None:
+            _count(self.capacity, 'trajectory.capacity')
+
+
+@dataclass(frozen=True, slots=True)
+class InstrumentationSpec:
+    enabled: bool = False
+    sink: str = 'memory'
+    path: str = None
+    profile_slots: tuple = None
+    profile_path: str = 'results/profile.pstats'
+
+    def __post_init__(self):
+        _flag(self.enabled, 'instrumentation.enabled')
+        _choice(self.sink, 'instrumentation.sink', SINKS)
+        if self.enabled and self.sink == 'jsonl':
+            _require(self.path is not None, 'instrumentation.path', "required by the jsonl sink")
+        if self.profile_slots is not None:
+            _require(len(self.profile_slots) == 2 and 0 <= self.profile_slots[0] < self.profile_slots[1],
+                     'instrumentation.profile_slots', f"expected [start, stop), got {self.profile_slots!r}")
+            object.__setattr__(self, 'profile_slots', tuple(self.profile_slots))
+
+
+@dataclass(frozen=True, slots=True)
+class ShardingSpec:
+    sections: int = 1
+    tiles: int = None
+    workers: int = None
+    view_radius: float = None
+
+    def __post_init__(self):
+        _count(self.sections, 'sharding.sections')
+        for name in ('tiles', 'workers'):
+            if getattr(self, name) is not None:
+                _count(getattr(self, name), f'sharding.{name}')
+        if self.view_radius is not None:
+            _positive(self.view_radius, 'sharding.view_radius')
+
+
+@dataclass(frozen=True, slots=True)
+class AgentsSpec:
+    latency_ms: float = 2.0
+    jitter_ms: float = 1.0
+    loss: float = 0.0
+    comm_range: float = None
+    view_radius: float = None
+    inbox_size: int = 64
+    max_message_bytes: int = 256
+    slot_ms: float = 10.0
+
+    def __post_init__(self):
+        for name in ('latency_ms', 'jitter_ms', 'slot_ms'):
+            _positive(getattr(self, name), f'agents.{name}', allow_zero=True)
+        _positive(self.loss, 'agents.loss', allow_zero=True)
+        _require(self.loss <= 1, 'agents.loss', f"must be a probability, got {self.loss!r}")
+        for name in ('comm_range', 'view_radius'):
+            if getattr(self, name) is not None:
+                _positive(getattr(self, name), f'agents.{name}')
+        _count(self.inbox_size, 'agents.inbox_size')
+        _count(self.max_message_bytes, 'agents.max_message_bytes')
+
+
+# Config sections compiled into typed specs; every other section is passed through as-is
+SECTIONS = {'iot': IoTSpec, 'uav': UAVSpec, 'threats': ThreatSpec,
+            'offloading': OffloadingSpec, 'energy': EnergySpec, 'gmm': GMMSpec,
+            'mpc': MPCSpec, 'patrol': PatrolSpec, 'spatial': SpatialSpec, 'checkpoint': CheckpointSpec,
+            'metrics': MetricsSpec, 'trajectory': TrajectorySpec, 'instrumentation': InstrumentationSpec,
+            'sharding': ShardingSpec, 'agents': AgentsSpec}
+REQUIRED = ('area_size', 'time_slots', 'iot', 'uav', 'threats', 'offloading', 'gmm')
+
+
+def _compile_section(name, values):
+    spec = SECTIONS[name]
+    _require(isinstance(values, dict), name, f"expected a section, got {values!r}")
+    known = {f.name for f in fields(spec) if f.init}
+    for key in sorted(set(values) - known):
+        raise ValueError(f"Unknown config key '{name}.{key}'")
+    for f in fields(spec):
+        if f.init and f.default is MISSING and f.name not in values:
+            raise ValueError(f"Missing config key '{name}.{f.name}'")
+    return spec(**values)
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """Validated, immutable compilation of a config dict.
+
+    Every section in SECTIONS is compiled into a typed spec; those the
+    simulation reads in its hot loops carry derived constants (squared
+    ranges, mode switches) computed once. The source config is kept too,
+    and to_config() copies it out for components that still take a dict. Compiling checks every
+    value, so an invalid config fails here rather than partway through a
+    run.
+    """
+    area_size: int
+    time_slots: int
+    iot: IoTSpec
+    uav: UAVSpec
+    threats: ThreatSpec
+    offloading: OffloadingSpec
+    energy: EnergySpec
+    gmm: GMMSpec
+    mpc: MPCSpec
+    patrol: PatrolSpec
+    spatial: SpatialSpec
+    checkpoint: CheckpointSpec
+    metrics: MetricsSpec
+    trajectory: TrajectorySpec
+    instrumentation: InstrumentationSpec
+    sharding: ShardingSpec
+    agents: AgentsSpec
+    mode: str = 'hybrid'
+    engine: str = 'slotted'
+    source: dict = field(default=None, repr=False, compare=False)
+    threats_enabled: bool = field(init=False, repr=False)
+    offloading_enabled: bool = field(init=False, repr=False)
+    initial_threats: int = field(init=False, repr=False)
+    spawn_rate: float = field(init=False, repr=False)
+
+    def __post_init__(self):
+        _count(self.area_size, 'area_size')
+        _count(self.time_slots, 'time_slots')
+        mode = str(self.mode).lower()
+        _require(mode in MODES, 'mode', f"must be one of {MODES}, got {self.mode!r}")
+        _choice(self.engine, 'engine', ENGINES)
+        object.__setattr__(self, 'mode', mode)
+        if self.source is not None:
+            # Engines that still take a dict read the mode from it, so it must be normalized there too
+            self.source['mode'] = mode
+        object.__setattr__(self, 'threats_enabled', mode != 'ecop')
+        object.__setattr__(self, 'offloading_enabled', mode != 'mpc-only')
+        object.__setattr__(self, 'initial_threats', self.threats.count if mode != 'ecop' else 0)
+        object.__setattr__(self, 'spawn_rate', self.threats.spawn_frequency if mode != 'ecop' else 0)
+
+    @classmethod
+    def from_config(cls, config):
+        if isinstance(config, Scenario):
+            return config
+        for key in REQUIRED:
+            if key not in config:
+                raise ValueError(f"Missing config key '{key}'")
+        specs = {name: _compile_section(name, config.get(name, {})) for name in SECTIONS}
+        return cls(area_size=config['area_size'], time_slots=config['time_slots'],
+                   mode=config.get('mode', 'hybrid'), engine=config.get('engine', 'slotted'),
+                   source=deepcopy(config), **specs)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_config(json.load(f))
+
+    def override(self, overrides):
+        """New scenario with dotted-key overrides applied, e.g. {'threats.count': 20}.
+
+        Only the overridden sections are rebuilt (and re-validated); the
+        rest are shared with this scenario, as are untouched sub-dicts of
+        the source config, which is why neither is ever mutated.
+        """
+        source = dict(self.source)
+        sections, top = {}, {}
+        for dotted, value in overrides.items():
+            keys = dotted.split('.')
+            node = source
+            for key in keys[:-1]:
+                node[key] = dict(node.get(key, {}))
+                node = node[key]
+            node[keys[-1]] = value
+            if keys[0] in SECTIONS:
+                sections[keys[0]] = True
+            elif len(keys) == 1 and keys[0] in ('area_size', 'time_slots', 'mode', 'engine'):
+                top[keys[0]] = value
+        specs = {name: _compile_section(name, source[name]) for name in sections}
+        return replace(self, source=source, **top, **specs)
+
+    def to_config(self):
+        """A fresh, independently mutable config dict for this scenario."""
+        return deepcopy(self.source)
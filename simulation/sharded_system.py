@@ -0,0 +1,496 @@
+# simulation/sharded_system.py
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from models.energy_model import EnergyModel
+from simulation.scenario import Scenario
+
+# Threat ids are (spawn slot, spawn section, k) packed as ((t + 1) * sections + section) << bits | k
+THREAT_ID_BITS = 20
+
+
+def section_rng(seed, t, section):
+    """Generator for everything drawn in one border section during slot t (t = -1 is the layout).
+
+    Streams are keyed by section, never by tile, so the draws are the same
+    however the border is cut into tiles.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(t + 1, section)))
+
+
+def pairs_within(xs, ys, qx, qy, radius, lo=0, hi=None):
+    """All (query, point) index pairs within `radius`, for points sorted by x.
+
+    Each query only scans the x-window [qx - radius, qx + radius] of the
+    points (clipped to points lo..hi), so the cost follows the pairs found
+    rather than queries times points. Pairs come out by query, then point.
+    """
+    hi = len(xs) if hi is None else hi
+    start = np.clip(np.searchsorted(xs, qx - radius, side='left'), lo, hi)
+    stop = np.clip(np.searchsorted(xs, qx + radius, side='right'), lo, hi)
+    counts = np.maximum(stop - start, 0)
+    query = np.repeat(np.arange(len(qx)), counts)
+    point = start[query] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    d2 = (xs[point] - qx[query]) ** 2 + (ys[point] - qy[query]) ** 2
+    near = d2 <= radius * radius
+    return query[near], point[near], d2[near]
+
+
+class SharedArrays:
+    """Named NumPy arrays laid out in one shared-memory block.
+
+    Created without a name, the block is allocated and zero-filled; other
+    processes attach to it with the same spec and the creator's `name`.
+    """
+
+    def __init__(self, spec, name=None):
+        offsets, size = {}, 0
+        for key, (shape, dtype) in spec.items():
+            size = -(-size // 64) * 64
+            offsets[key] = size
+            size += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.arrays = {key: np.ndarray(shape, dtype, buffer=self.shm.buf, offset=offsets[key])
+                       for key, (shape, dtype) in spec.items()}
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.arrays = None  # Views must go before the buffer can be released
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class BorderTile:
+    """One contiguous run of border sections, advanced a slot at a time.
+
+    A section is one area_size-wide piece of the border strip with the
+    standard layout: iot.device_count devices on the wavy border line,
+    uav.count UAVs and its own threat arrivals. Device and UAV state lives
+    in arrays shared by all tiles, indexed by global id. Each tile writes
+    only the devices of its own sections and the UAVs it holds. It reads a
+    halo of neighbouring state, at most one tile wide, once the phase that
+    wrote it has finished.
+
+    Per slot the phases are:
+    - begin_slot: draw the sections' energy samples and task sizes, and
+      forecast which devices are active.
+    - plan: each held UAV flies to the nearest active device within
+      view_radius, serves every active device in range of it, then snaps
+      to its patrol waypoint. A UAV moving into another tile's range is
+      handed over by updating its owner.
+    - offload: apply device drains, then offload tasks. Each task bids for
+      its cheapest UAV in range. That UAV accepts by regret until its
+      energy or capacity runs out; tasks it cannot fit are dropped for the
+      slot.
+    - update_threats: spawn, move and neutralize the tile's threats. Those
+      that cross a tile edge are returned for the neighbour (halo exchange).
+    - record: write the slot's per-section and per-UAV metrics.
+    """
+
+    def __init__(self, index, first, last, scenario, seed, arrays, tile_of_section):
+        self.index = index
+        self.first, self.last = first, last
+        self.seed = seed
+        self.a = arrays
+        self.tile_of_section = tile_of_section
+        self.scenario = scenario
+        self.mode = scenario.mode
+        self.area_size = A = scenario.area_size
+        self.sections = len(tile_of_section)
+        self.x0, self.x1 = first * A, last * A
+        self.border_length = self.sections * A
+        self.D = scenario.iot.device_count
+        self.U = scenario.uav.count
+        self.battery_range = scenario.iot.battery_range
+        self.uav_battery = float(scenario.uav.battery)
+        self.window = scenario.gmm.history_window
+        self.service_range = scenario.uav.service_range
+        self.view_radius = view_radius(scenario)
+        offloading = scenario.offloading
+        self.threshold = offloading.energy_threshold
+        self.consumption = offloading.consumption_per_slot
+        self.reserve = offloading.energy_reserve
+        self.capacity = np.inf if offloading.uav_capacity is None else float(offloading.uav_capacity)
+        self.energy_model = EnergyModel.from_config(scenario.source)
+        self.spawn_rate = scenario.spawn_rate
+        self.initial_threats = scenario.initial_threats
+
+        # Devices are in border order globally, so patrol segments are index ranges
+        N, Ut = self.sections * self.D, self.sections * self.U
+        segment = max(1, N // Ut)
+        start = np.arange(Ut) * segment
+        end = np.minimum(start + segment, N)
+        empty = end <= start
+        self.patrol_start = np.where(empty, 0, start)
+        self.patrol_len = np.where(empty, N, end - start)
+
+        self.rows = slice(first * self.D, last * self.D)
+        self.streams = {}
+        self.uavs = self.held = np.empty(0, dtype=np.int64)
+        self.drained = np.empty(0, dtype=np.int64)
+        self.threat_ids = np.empty(0, dtype=np.int64)
+        self.threat_pos = np.empty((0, 2))
+
+    def owner_of(self, x):
+        section = np.minimum((np.asarray(x) // self.area_size).astype(np.int64), self.sections - 1)
+        return self.tile_of_section[section]
+
+    def _threat_positions(self, rng, section, n):
+        middle = self.area_size // 2
+        bottom = rng.random(n) < 0.5
+        x = section * self.area_size + rng.integers(0, self.area_size, size=n)
+        y = np.where(bottom, rng.integers(middle - 20, middle - 10, size=n),
+                     rng.integers(middle + 10, middle + 20, size=n))
+        return np.column_stack([x, y]).astype(float)
+
+    def _add_threats(self, t, section, positions):
+        base = ((t + 1) * self.sections + section) << THREAT_ID_BITS
+        ids = base + np.arange(len(positions), dtype=np.int64)
+        self.threat_ids = np.concatenate([self.threat_ids, ids])
+        self.threat_pos = np.concatenate([self.threat_pos, positions])
+
+    def init_layout(self):
+        a, A, D, U = self.a, self.area_size, self.D, self.U
+        i = np.arange(D)
+        for s in range(self.first, self.last):
+            rng = section_rng(self.seed, -1, s)
+            rows = slice(s * D, (s + 1) * D)
+            a['dev_x'][rows] = s * A + np.clip((i * A / D).astype(int), 0, A - 1)
+            a['dev_y'][rows] = np.clip((A // 2 + 10 * np.sin(i / 15.0)
+                                        + rng.integers(-2, 3, size=D)).astype(int), 0, A - 1)
+            a['dev_energy'][rows] = rng.uniform(*self.battery_range, size=D)
+            uavs = slice(s * U, (s + 1) * U)
+            a['uav_x'][uavs] = [s * A + int(A * (j + 1) / (U + 1)) for j in range(U)]
+            a['uav_y'][uavs] = A // 2
+            a['uav_energy'][uavs] = self.uav_battery
+            a['uav_owner'][uavs] = self.index
+            if self.initial_threats:
+                self._add_threats(-1, s, self._threat_positions(rng, s, self.initial_threats))
+
+    def begin_slot(self, t):
+        a, D = self.a, self.D
+        self.streams = {s: section_rng(self.seed, t, s) for s in range(self.first, self.last)}
+        for s, rng in self.streams.items():
+            rows = slice(s * D, (s + 1) * D)
+            a['history'][rows, t % self.window] = rng.uniform(0.5, 3.0, size=D)
+            a['data'][rows] = rng.integers(10, 100, size=D)  # in MB
+        filled = min(t + 1, self.window)
+        mean = a['history'][self.rows].sum(axis=1) / filled
+        # The predictors fall back to 1.0 until a window holds one sample per component
+        forecast = np.maximum(mean, 0.1) if filled >= 2 else np.ones(len(mean))
+        a['active'][self.rows] = forecast > self.threshold
+        a['drain'][self.index, self.drained] = 0
+        self.uavs = np.flatnonzero(a['uav_owner'] == self.index)
+
+    def plan(self, t):
+        a = self.a
+        dev_x, dev_y, active = a['dev_x'], a['dev_y'], a['active']
+        uavs = self.uavs
+        # Nearest active device within view of each held UAV (lowest index on ties)
+        query, device, d2 = pairs_within(dev_x, dev_y, a['uav_x'][uavs], a['uav_y'][uavs], self.view_radius)
+        keep = active[device]
+        query, device, d2 = query[keep], device[keep], d2[keep]
+        order = np.lexsort((device, d2, query))
+        first = order[np.r_[True, query[order][1:] != query[order][:-1]]] if len(order) else order
+        movers, target = uavs[query[first]], device[first]
+        a['uav_energy'][movers] -= self.energy_model.cost(distance=np.sqrt(d2[first]), hover=1)
+
+        # Serve every active device in range of each target
+        _, served, _ = pairs_within(dev_x, dev_y, dev_x[target], dev_y[target], self.service_range)
+        served = served[active[served]]
+        np.add.at(a['drain'][self.index], served, 1)
+        self.drained = served
+
+        # Snap to the patrol segments, then hand UAVs that left the tile to their new owner
+        uavs = self.uavs
+        waypoint = self.patrol_start[uavs] + t % self.patrol_len[uavs]
+        a['uav_x'][uavs] = dev_x[waypoint]
+        a['uav_y'][uavs] = dev_y[waypoint]
+        a['bid_energy'][uavs] = a['uav_energy'][uavs]
+        a['uav_owner'][uavs] = self.owner_of(a['uav_x'][uavs])
+
+    def offload(self, t):
+        a = self.a
+        self.held = np.flatnonzero(a['uav_owner'] == self.index)
+        drained = a['drain'][self.index, self.rows].copy()
+        for side in (self.index - 1, self.index + 1):
+            if 0 <= side < len(a['drain']):
+                drained += a['drain'][side, self.rows]
+        energy = a['dev_energy'][self.rows]
+        hit = drained > 0
+        energy[hit] = np.maximum(energy[hit] - drained[hit] * self.consumption, 0.0)
+        if not self.scenario.offloading_enabled or not len(self.held):  # Don't offload in MPC-only
+            return
+
+        sr = self.service_range
+        dev_x, dev_y, active = a['dev_x'], a['dev_y'], a['active']
+        # Tasks that may bid for a held UAV, and every UAV those tasks could reach
+        t_lo, t_hi = np.searchsorted(dev_x, [self.x0 - sr, self.x1 + sr], side='left')
+        uav_x, uav_y = a['uav_x'], a['uav_y']
+        window = np.flatnonzero((uav_x >= self.x0 - 2 * sr) & (uav_x < self.x1 + 2 * sr))
+        query, task, dist_sq = pairs_within(dev_x, dev_y, uav_x[window], uav_y[window], sr, t_lo, t_hi)
+        keep = active[task]
+        uav, task = window[query[keep]], task[keep]
+        if not len(task):
+            return
+        cost = dist_sq[keep] + (100 - a['bid_energy'][uav])  # penalize low energy UAVs
+
+        # Best and second-best bid per task (lowest UAV id on ties)
+        order = np.lexsort((uav, cost, task))
+        task, uav, cost = task[order], uav[order], cost[order]
+        first = np.r_[True, task[1:] != task[:-1]]
+        best = np.flatnonzero(first)
+        best = best[(best + 1 < len(task)) & ~np.r_[first[1:], True][best]]  # tasks with a runner-up
+        regret = np.full(len(task), np.inf)
+        regret[best] = cost[best + 1] - cost[best]
+        mine = first & (a['uav_owner'][uav] == self.index)
+        task, uav, regret = task[mine], uav[mine], regret[mine]
+        if not len(task):
+            return
+
+        # Within each held UAV, take the highest-regret tasks first up to its limits
+        order = np.lexsort((task, -regret, uav))
+        task, uav = task[order], uav[order]
+        data = a['data'][task]
+        task_energy = self.energy_model.task_costs(data)
+        group_start = np.flatnonzero(np.r_[True, uav[1:] != uav[:-1]])
+        group_len = np.diff(np.r_[group_start, len(uav)])
+        cum_mb = np.cumsum(data)
+        cum_mb -= np.repeat(cum_mb[group_start] - data[group_start], group_len)
+        cum_energy = np.cumsum(task_energy)
+        cum_energy -= np.repeat(cum_energy[group_start] - task_energy[group_start], group_len)
+        room = np.maximum(a['uav_energy'][uav] - self.reserve, 0.0)
+        accept = (cum_mb <= self.capacity) & (cum_energy <= room)
+        spent = np.bincount(uav[accept], weights=task_energy[accept], minlength=len(uav_x))
+        a['uav_energy'][self.held] -= spent[self.held]  # Offloading cost
+
+    def update_threats(self, t):
+        """Spawn, move and neutralize this tile's threats; returns the (left, right) emigrants."""
+        if not self.spawn_rate and not len(self.threat_ids):
+            empty = (np.empty(0, dtype=np.int64), np.empty((0, 2)))
+            return empty, empty
+        A, sr = self.area_size, self.service_range
+        for s, rng in self.streams.items():
+            count = rng.poisson(self.spawn_rate)
+            self._add_threats(t, s, self._threat_positions(rng, s, count))
+
+        # Each section moves its threats in id order from its own stream
+        section = np.minimum((self.threat_pos[:, 0] // A).astype(np.int64), self.sections - 1)
+        moved_ids, moved_pos, moved_section = [], [], []
+        for s, rng in self.streams.items():
+            idx = np.flatnonzero(section == s)
+            idx = idx[np.argsort(self.threat_ids[idx], kind='stable')]
+            pos = self.threat_pos[idx]
+            direction = np.where(pos[:, 1] > A // 2, -1, 1)
+            pos[:, 1] = np.clip(pos[:, 1] + direction * rng.integers(1, 4, size=len(pos)), 0, A - 1)
+            pos[:, 0] = np.clip(pos[:, 0] + rng.integers(-2, 3, size=len(pos)), 0, self.border_length - 1)
+            moved_ids.append(self.threat_ids[idx])
+            moved_pos.append(pos)
+            moved_section.append(np.full(len(idx), s))
+        ids, pos, section = np.concatenate(moved_ids), np.concatenate(moved_pos), np.concatenate(moved_section)
+
+        # Neutralized threats retire at once; nothing reads them before the next slot's retire
+        uav_x, uav_y = self.a['uav_x'], self.a['uav_y']
+        window = np.flatnonzero((uav_x >= self.x0 - sr - 2) & (uav_x < self.x1 + sr + 2))
+        order = np.argsort(pos[:, 0], kind='stable')
+        _, caught, _ = pairs_within(pos[order, 0], pos[order, 1], uav_x[window], uav_y[window], sr)
+        neutralized = np.zeros(len(ids), dtype=bool)
+        neutralized[order[caught]] = True
+        counts = np.bincount(section[neutralized] - self.first, minlength=self.last - self.first)
+        self.a['neutralized'][t, self.first:self.last] = counts
+
+        ids, pos = ids[~neutralized], pos[~neutralized]
+        left, right = pos[:, 0] < self.x0, pos[:, 0] >= self.x1
+        stay = ~(left | right)
+        self.threat_ids, self.threat_pos = ids[stay], pos[stay]
+        return (ids[left], pos[left]), (ids[right], pos[right])
+
+    def receive(self, batch):
+        ids, pos = batch
+        self.threat_ids = np.concatenate([self.threat_ids, ids])
+        self.threat_pos = np.concatenate([self.threat_pos, pos])
+
+    def record(self, t):
+        a, D = self.a, self.D
+        own = slice(self.first, self.last)
+        a['device_energy_log'][t, own] = a['dev_energy'][self.rows].reshape(-1, D).sum(axis=1)
+        a['served'][t, own] = a['active'][self.rows].reshape(-1, D).sum(axis=1)
+        a['uav_energy_log'][t, self.held] = a['uav_energy'][self.held]
+        a['live_threats'][t, self.index] = len(self.threat_ids)
+
+
+def view_radius(scenario):
+    return scenario.source.get('sharding', {}).get('view_radius') or scenario.iot.sensing_range
+
+
+def _tile_worker(index, first, last, scenario, seed, spec, name, tile_of_section, barrier, inboxes):
+    shared = SharedArrays(spec, name)
+    tile = BorderTile(index, first, last, scenario, seed, shared.arrays, tile_of_section)
+    neighbours = [side for side in (index - 1, index + 1) if 0 <= side < len(inboxes)]
+    try:
+        tile.init_layout()
+        barrier.wait()
+        for t in range(scenario.time_slots):
+            tile.begin_slot(t)
+            barrier.wait()
+            tile.plan(t)
+            barrier.wait()
+            tile.offload(t)
+            left, right = tile.update_threats(t)
+            for side, batch in ((index - 1, left), (index + 1, right)):
+                if side in neighbours:
+                    inboxes[side].put(batch)
+            for _ in neighbours:
+                batch = inboxes[index].get()
+                if batch is None:
+                    raise RuntimeError(f"Neighbour of tile {index} failed")
+                tile.receive(batch)
+            tile.record(t)
+    except BaseException:
+        barrier.abort()
+        for side in neighbours:
+            inboxes[side].put(None)
+        raise
+    finally:
+        del tile
+        shared.close()
+
+
+class ShardedBorderSystem:
+    """Border strip of sharding.sections areas side by side, split into tiles.
+
+    Each tile owns a contiguous run of sections. With workers=1 the tiles
+    run one after another in this process. Otherwise each tile runs in its
+    own worker process, with device and UAV state in shared memory, and
+    threats crossing a tile edge travel to the neighbour's inbox at the end
+    of the slot. Randomness is drawn per (slot, section) and every
+    cross-tile interaction is read from shared state behind a barrier, so
+    the metrics are identical for any tiling and worker count, including a
+    single tile.
+
+    The dynamics follow BatchedUAVSystem, made local so a tile only needs
+    its neighbours' edges. UAVs patrol x-sorted border segments rather than
+    planned tours, and target the nearest active device within view_radius
+    rather than anywhere on the border. A task that its cheapest UAV cannot
+    fit is dropped for the slot rather than re-bid.
+
+    `config` may be a dict or a Scenario; tiles read the compiled Scenario.
+    """
+
+    def __init__(self, config, seed=0, tiles=None, workers=None):
+        self.scenario = scenario = Scenario.from_config(config)
+        if isinstance(config, Scenario):
+            config = scenario.to_config()
+        sharding = config.get('sharding', {})
+        self.config = config
+        self.seed = seed
+        self.sections = int(sharding.get('sections', 1))
+        self.workers = int(workers or sharding.get('workers') or 1)
+        self.tiles = int(tiles or sharding.get('tiles') or self.workers)
+        if self.sections < 1:
+            raise ValueError("sharding.sections must be at least 1")
+        if not 1 <= self.tiles <= self.sections:
+            raise ValueError(f"Need between 1 and {self.sections} tiles, got {self.tiles}")
+        if self.workers not in (1, self.tiles):
+            raise ValueError("sharding.workers must be 1 (serial) or equal to the number of tiles")
+        # A tile must be at least as wide as the halo it reads from its neighbours
+        sr = scenario.uav.service_range
+        halo = max(view_radius(scenario) + sr, 2 * sr, sr + 2)
+        width = (self.sections // self.tiles) * scenario.area_size
+        if width < halo:
+            raise ValueError(f"Tiles {width} wide are narrower than their {halo} halo; use fewer tiles")
+        if scenario.threats.count >= 1 << THREAT_ID_BITS:
+            raise ValueError(f"threats.count must be below {1 << THREAT_ID_BITS}")
+
+        bounds = np.linspace(0, self.sections, self.tiles + 1).round().astype(int)
+        self.bounds = list(zip(bounds[:-1], bounds[1:]))
+        self.tile_of_section = np.repeat(np.arange(self.tiles), np.diff(bounds))
+
+        S, T = self.sections, scenario.time_slots
+        N, Ut = S * scenario.iot.device_count, S * scenario.uav.count
+        self.spec = {
+            'dev_x': ((N,), 'f8'), 'dev_y': ((N,), 'f8'), 'dev_energy': ((N,), 'f8'),
+            'history': ((N, scenario.gmm.history_window), 'f8'),
+            'active': ((N,), 'bool'), 'data': ((N,), 'f8'),
+            'drain': ((self.tiles, N), 'i8'),
+            'uav_x': ((Ut,), 'f8'), 'uav_y': ((Ut,), 'f8'), 'uav_energy': ((Ut,), 'f8'),
+            'bid_energy': ((Ut,), 'f8'), 'uav_owner': ((Ut,), 'i8'),
+            'device_energy_log': ((T, S), 'f8'), 'served': ((T, S), 'i8'),
+            'neutralized': ((T, S), 'i8'), 'uav_energy_log': ((T, Ut), 'f8'),
+            'live_threats': ((T, self.tiles), 'i8'),
+        }
+        self.metrics = None
+
+    def run_simulation(self):
+        if self.workers == 1:
+            arrays = {key: np.zeros(shape, dtype) for key, (shape, dtype) in self.spec.items()}
+            self._run_serial(arrays)
+            self.metrics = self._merge(arrays)
+            return self.metrics
+
+        shared = SharedArrays(self.spec)
+        try:
+            self._run_parallel(shared.name)
+            self.metrics = self._merge(shared.arrays)
+        finally:
+            shared.close()
+            shared.unlink()
+        return self.metrics
+
+    def _run_serial(self, arrays):
+        tiles = [BorderTile(k, first, last, self.scenario, self.seed, arrays, self.tile_of_section)
+                 for k, (first, last) in enumerate(self.bounds)]
+        for tile in tiles:
+            tile.init_layout()
+        for t in range(self.scenario.time_slots):
+            for tile in tiles:
+                tile.begin_slot(t)
+            for tile in tiles:
+                tile.plan(t)
+            inboxes = [[] for _ in tiles]
+            for k, tile in enumerate(tiles):
+                tile.offload(t)
+                left, right = tile.update_threats(t)
+                if k > 0:
+                    inboxes[k - 1].append(left)
+                if k + 1 < len(tiles):
+                    inboxes[k + 1].append(right)
+            for tile, inbox in zip(tiles, inboxes):
+                for batch in inbox:
+                    tile.receive(batch)
+                tile.record(t)
+
+    def _run_parallel(self, name):
+        ctx = mp.get_context()
+        barrier = ctx.Barrier(self.tiles)
+        inboxes = [ctx.Queue() for _ in range(self.tiles)]
+        processes = [ctx.Process(target=_tile_worker, args=(
+            k, first, last, self.scenario, self.seed, self.spec, name, self.tile_of_section, barrier, inboxes))
+            for k, (first, last) in enumerate(self.bounds)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        failed = [k for k, process in enumerate(processes) if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Sharded simulation failed in tiles {failed}")
+
+    def _merge(self, arrays):
+        """Per-slot totals over all sections and UAVs, reduced in a fixed order."""
+        energy_spent = arrays['device_energy_log'].sum(axis=1) + arrays['uav_energy_log'].sum(axis=1)
+        served = arrays['served'].sum(axis=1)
+        positive = energy_spent > 0
+        return {
+            'energy_efficiency': np.where(positive, served / np.where(positive, energy_spent, 1), 0).tolist(),
+            'total_energy': energy_spent.tolist(),
+            'threats_handled': arrays['neutralized'].sum(axis=1).tolist(),
+            'live_threats': arrays['live_threats'].sum(axis=1).tolist(),
+        }
@@ -2,82 +2,93 @@
 import numpy as np
 from models.iot_device import IoTDevice
 from models.uav_node import UAV
-from models.threat import Threat
+from models.threat_pool import ThreatPool
+from models.fleet_state import FleetState
+from models.spatial_index import make_spatial_index
 from mpc.predictor import GMMPredictor
+from mpc.batched_predictor import BatchedGMMPredictor
 from mpc.mpc_controller import MPCController
+from mpc.patrol_planner import patrol_paths
 from offloading.offloading_manager import OffloadingManager
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import random
+from offloading.task_queue import TaskQueues
+from simulation.instrumentation import Instrumentation
+from simulation.trajectory import DEFAULT_CAPACITY, TrajectoryRecorder
+from simulation.metrics_stream import MetricsStream
+from simulation.checkpoint import save_checkpoint
+from simulation.scenario import Scenario
+from simulation.rng import RNGService
 
 class DecentralizedUAVSystem:
-    def __init__(self, config):
-        self.mode = config.get("mode", "hybrid")  # default is hybrid
+    def __init__(self, config, instruments=None, seed=None):
+        # Compiling validates the whole config before anything is built
+        self.scenario = scenario = Scenario.from_config(config)
+        if isinstance(config, Scenario):
+            config = scenario.to_config()
+        self.mode = scenario.mode  # default is hybrid
         self.config = config
-        self.area_size = config['area_size']
-        self.time_slots = config['time_slots']
+        self.area_size = scenario.area_size
+        self.time_slots = scenario.time_slots
+        if seed is None:
+            seed = config.get('experiments', {}).get('seed', 0)
+        self.rng = RNGService(seed)
 
         # Adjusted wave frequency for a smoother border line
         self.devices = []
         self.border_path = sorted([(d.x, d.y) for d in self.devices], key=lambda p: p[0])
-        for i in range(config['iot']['device_count']):
-            x = int(i * self.area_size / config['iot']['device_count'])
+        iot = scenario.iot
+        layout = self.rng.stream('layout')
+        jitter = layout.integers(-2, 3, size=iot.device_count)
+        batteries = layout.uniform(*iot.battery_range, size=iot.device_count)
+        for i in range(iot.device_count):
+            x = int(i * self.area_size / iot.device_count)
             y_offset = 10 * np.sin(i / 15.0)  # Lower frequency wave
-            y = int(self.area_size // 2 + y_offset + np.random.randint(-2, 3))
+            y = int(self.area_size // 2 + y_offset + jitter[i])
             self.devices.append(IoTDevice(
                 id=i,
                 x=np.clip(x, 0, self.area_size - 1),
                 y=np.clip(y, 0, self.area_size - 1),
-                battery=np.random.uniform(*config['iot']['battery_range']),
-                sensing_range=config['iot']['sensing_range']
+                battery=batteries[i],
+                sensing_range=iot.sensing_range
             ))
 
-        # Increase UAV count to 3
+        num_uavs = scenario.uav.count
         self.uavs = [
             UAV(id=j,
-                x=int(self.area_size // 4 * (j + 1)),
+                x=int(self.area_size * (j + 1) / (num_uavs + 1)),
                 y=self.area_size // 2,
-                battery=config['uav']['battery'],
-                hover_time=config['uav']['hover_time'])
-            for j in range(3)
+                battery=scenario.uav.battery,
+                hover_time=scenario.uav.hover_time)
+            for j in range(num_uavs)
         ]
         self.border_path = sorted([(d.x, d.y) for d in self.devices], key=lambda p: p[0])
-        total_points = len(self.border_path)
-        num_uavs = len(self.uavs)
-        segment_size = max(1, total_points // num_uavs)
-
-        self.uav_patrol_paths = []
-
-        for i in range(num_uavs):
-            start = i * segment_size
-            end = min((i + 1) * segment_size, total_points)
-            path = self.border_path[start:end]
-
-            # Fallback to entire border if segment is empty
-            if not path:
-                path = self.border_path
-
-            self.uav_patrol_paths.append(path)
-
-        for i in range(num_uavs):
-            start = i * segment_size
-            end = (i + 1) * segment_size if i != num_uavs - 1 else len(self.border_path)
-            path = self.border_path[start:end]
-            self.uav_patrol_paths.append(path)
-
-        # Fewer threats and closer to the border
-        self.threats = []
-        if self.mode != "ecop":  # Skip threats if in ECOP mode
-            for i in range(self.config['threats']['count']):
-                side = np.random.choice(['top', 'bottom'])
-                x = np.random.randint(0, self.area_size)
-                y = np.random.randint(self.area_size // 2 - 20, self.area_size // 2 - 10) if side == 'bottom' else np.random.randint(self.area_size // 2 + 10, self.area_size // 2 + 20)
-                self.threats.append(Threat(id=i, x=x, y=y))
-
-
-        self.gmm = GMMPredictor()
-        self.controller = MPCController(self.devices, self.uavs, config, self.gmm)
-        self.offloader = OffloadingManager(self.uavs, config)
+        # One closed patrol tour per UAV as an (n x 2) waypoint array, cached per layout
+        self.uav_patrol_paths = patrol_paths(
+            config, [(d.x, d.y) for d in self.devices], [(u.x, u.y) for u in self.uavs])
+
+        # Threats enter close to the border; new intruders keep spawning at
+        # threats.spawn_frequency per slot and neutralized ones are retired
+        initial = scenario.initial_threats  # Skip threats if in ECOP mode
+        self.spawn_rate = scenario.spawn_rate
+        pool_capacity = scenario.threats.pool_capacity  # A fixed cap when set; otherwise the pool grows
+        capacity = pool_capacity or ThreatPool.default_capacity(initial, self.spawn_rate, self.time_slots)
+        self.threat_pool = ThreatPool(capacity, self.area_size, growable=pool_capacity is None)
+        self.threat_pool.spawn(self.threat_pool.sample_positions(initial, self.rng.stream('threats')))
+
+        self.device_state = FleetState.bind(self.devices)
+        self.uav_state = FleetState.bind(self.uavs)
+        self.threat_state = self.threat_pool.state
+        self.threat_index = make_spatial_index(
+            config.get('spatial', {}).get('index', 'grid'),
+            scenario.uav.service_range).build(self.threat_state.positions)
+
+        if scenario.gmm.engine == 'batched':
+            self.gmm = BatchedGMMPredictor(incremental=scenario.gmm.incremental, drift_z=scenario.gmm.drift_z)
+        else:
+            self.gmm = GMMPredictor()
+        self.controller = MPCController(self.devices, self.uavs, config, self.gmm, scenario, self.rng)
+        self.offloader = OffloadingManager(self.uavs, config, scenario)
+        self.task_queues = TaskQueues([uav.id for uav in self.uavs], scenario.offloading)
+        self.queue_stats = None
 
         self.metrics = {
             'energy_efficiency': [],
@@ -85,64 +96,199 @@ class DecentralizedUAVSystem:
             'threats_handled': []
         }
 
-        self.visual_frames = []
+        metrics_config = config.get('metrics', {})
+        self.keep_metrics = metrics_config.get('keep_in_memory', True)
+        self.metrics_stream = None
+        if metrics_config.get('stream_path'):
+            self.metrics_stream = MetricsStream(metrics_config['stream_path'],
+                                                metrics_config.get('batch_size', 256))
+
+        self.offload_stats = None
+        self.slot = 0
+        self.next_slot = 0
+        trajectory = config.get('trajectory', {})
+        self.trajectory = TrajectoryRecorder(
+            self.device_state.positions, len(self.uavs), max(1, len(self.threat_pool)),
+            capacity=trajectory.get('capacity') or min(self.time_slots, DEFAULT_CAPACITY),
+            spill_dir=trajectory.get('spill_dir'))
+        self.instruments = instruments if instruments is not None else Instrumentation.from_config(config)
+
+    @property
+    def threats(self):
+        """Threat views of the occupied pool slots, neutralized ones included until retired."""
+        return self.threat_pool.views()
 
     def run_simulation(self):
-        for t in range(self.time_slots):
+        for _ in self.iter_simulation():
+            pass
+
+        return self.metrics
+
+    def iter_simulation(self):
+        """Run the simulation, yielding each slot's metric record as soon as it is produced.
+
+        Starts at self.next_slot, so a system restored from a checkpoint
+        picks up where the snapshot was taken.
+        """
+        checkpoint = self.config.get('checkpoint', {})
+        every = checkpoint.get('every')
+        for t in range(self.next_slot, self.time_slots):
             print(f"[TIME {t}] Running MPC optimization...")
-            actual_energy_data = {d.id: np.random.uniform(0.5, 3.0) for d in self.devices}
-            self.controller.update_energy_history(actual_energy_data)
-            assignments, active_devices = self.controller.optimize()
+            record = self.step(t)
+            if every and self.next_slot % every == 0:
+                save_checkpoint(self, checkpoint['path'])
+            yield record
+        self.close()
+
+    def close(self):
+        self.trajectory.close()
+        if self.metrics_stream is not None:
+            self.metrics_stream.close()
+        self.instruments.close()
+
+    def step(self, t):
+        """Advance the simulation by one time slot."""
+        self.slot = t
+        instruments = self.instruments
+        instruments.begin_slot(t)
+        with instruments.phase('forecast'):
+            self.forecast_energy(t)
+        with instruments.phase('optimize'):
+            active_devices = self.plan_uavs(t)
+        with instruments.phase('offload'):
+            self.offload_tasks(active_devices, t)
+        with instruments.phase('threats'):
+            neutralized = self.update_threats(t)
+        with instruments.phase('metrics'):
+            record = self.collect_metrics(active_devices, neutralized)
+        instruments.end_slot()
+        self.next_slot = t + 1
+        return record
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['instruments'] = None  # sinks hold open files; rebuilt from config on load
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def reopen_outputs(self, metrics_path=None, spill_dir=None):
+        """Reattach the on-disk outputs after a checkpoint load, optionally at new paths."""
+        if self.metrics_stream is not None:
+            self.metrics_stream.reopen(metrics_path)
+        self.trajectory.reopen(spill_dir)
+        self.instruments = Instrumentation.from_config(self.config)
+
+    def forecast_energy(self, t):
+        actual_energy_data = self.rng.energy_samples(t, len(self.devices))
+        self.controller.update_energy_history(actual_energy_data)
+        self.instruments.count('devices_forecast', len(self.devices))
+
+    def plan_uavs(self, t):
+        live = self.threat_pool.live
+        assignments, active_devices = self.controller.optimize(self.threat_state.positions[live])
+        planner = self.controller.planner
+        if planner is None:
             for idx, uav in enumerate(self.uavs):
                 path = self.uav_patrol_paths[idx]
                 pos = path[t % len(path)]  # loop over segment
                 uav.x, uav.y = pos
-            if self.mode != "mpc-only":  # Don't offload in MPC-only
-                for device in active_devices:
-                    task = device.generate_task()
-                    self.offloader.assign_task(device, task)
-
-
-            neutralized = 0
-            if self.mode != "ecop":  # No threat logic in ECOP
-                for threat in self.threats:
-                    if not threat.neutralized:
-                        direction = -1 if threat.y > self.area_size // 2 else 1
-                        threat.y = np.clip(threat.y + direction * np.random.randint(1, 4), 0, self.area_size - 1)
-                        threat.x = np.clip(threat.x + np.random.randint(-2, 3), 0, self.area_size - 1)
-
-                for threat in self.threats:
-                    if not threat.neutralized:
-                        for uav in self.uavs:
-                            if threat.is_near(uav.x, uav.y, self.config['uav']['service_range']):
-                                threat.neutralized = True
-                                neutralized += 1
-                                break
-
-
-            energy_spent = sum([d.energy for d in self.devices]) + sum([u.energy for u in self.uavs])
-            served_devices = len(active_devices)
-
-            if energy_spent > 0:
-                self.metrics['energy_efficiency'].append(served_devices / energy_spent)
-            else:
-                self.metrics['energy_efficiency'].append(0)
-
+        else:  # The horizon planner owns UAV positions
+            self.instruments.count('planner_solve_ms', planner.last_ms)
+            self.instruments.count('planner_over_budget', int(planner.last_ms > planner.budget_ms))
+        return active_devices
+
+    def offload_tasks(self, active_devices, t):
+        if self.scenario.offloading_enabled:  # Don't offload in MPC-only
+            # One draw per device, active or not, so a task's size depends only on (slot, device)
+            data_size, urgency = self.rng.tasks(t, len(self.devices))
+            tasks = [device.generate_task(data_size[device.id], urgency[device.id]) for device in active_devices]
+            assignments, self.offload_stats = self.offloader.assign_batch(tasks)
+            self.instruments.count('tasks_offloaded', self.offload_stats['accepted'])
+            # Accepted tasks join their UAV's queue; service carries backlog across slots
+            self.task_queues.enqueue(tasks, assignments, self.slot)
+            self.queue_stats = self.task_queues.serve(self.slot)
+            self.instruments.count('tasks_completed', self.queue_stats['tasks_completed'])
+
+    def update_threats(self, t):
+        neutralized = 0
+        if self.scenario.threats_enabled:  # No threat logic in ECOP
+            pool = self.threat_pool
+            state = self.threat_state
+            rng = self.rng.stream('threats', t)
+            # Last slot's neutralized threats free their slots for this slot's arrivals
+            retired = pool.retire(state.neutralized[:state.size])
+            arrivals = rng.poisson(self.spawn_rate) if self.spawn_rate else 0
+            spawned = len(pool.spawn(pool.sample_positions(arrivals, rng)))
+            pool.step(rng)
+
+            # Range-query the threat index around each UAV instead of testing every pair
+            if len(self.threat_index) != state.size:
+                self.threat_index.build(state.positions)  # The pool grew
+            self.threat_index.update(np.arange(state.size), state.positions)
+            checks = self.threat_index.checks
+            near = np.zeros(state.size, dtype=bool)
+            service_range = self.scenario.uav.service_range
+            for uav in self.uavs:
+                near[self.threat_index.query_radius(uav.x, uav.y, service_range)] = True
+            newly = near & pool.live
+            state.neutralized[:state.size] |= newly
+            neutralized = int(newly.sum())
+            self.instruments.count('proximity_checks', self.threat_index.checks - checks)
+            self.instruments.count('threats_spawned', spawned)
+            self.instruments.count('threats_retired', retired)
+            self.instruments.count('threats_live', len(pool))
+        return neutralized
+
+    def collect_metrics(self, active_devices, neutralized):
+        energy_spent = (self.device_state.energy[:self.device_state.size].sum()
+                        + self.uav_state.energy[:self.uav_state.size].sum())
+        served_devices = len(active_devices)
+
+        efficiency = served_devices / energy_spent if energy_spent > 0 else 0
+
+        if self.keep_metrics:
+            self.metrics['energy_efficiency'].append(efficiency)
             self.metrics['threats_handled'].append(neutralized)
             self.metrics['total_energy'].append(energy_spent)
 
-            self.visual_frames.append({
-                'uavs': [(uav.x, uav.y) for uav in self.uavs],
-                'devices': [(d.x, d.y) for d in self.devices],
-                'threats': [(th.x, th.y, th.neutralized) for th in self.threats]
-            })
-
-        return self.metrics
+        uav_count = self.uav_state.size
+        record = {
+            'slot': self.slot,
+            'energy_efficiency': efficiency,
+            'total_energy': energy_spent,
+            'threats_handled': neutralized,
+            'served_devices': served_devices,
+            'uav_energy': self.uav_state.energy[:uav_count].copy(),
+            'uav_x': self.uav_state.pos[:uav_count, 0].copy(),
+            'uav_y': self.uav_state.pos[:uav_count, 1].copy(),
+            'uav_tasks': np.array(self.offload_stats['per_uav'] if self.offload_stats else [0] * uav_count),
+        }
+        queue_stats = self.queue_stats or {}
+        for name in ('throughput_mb', 'tasks_completed', 'deadline_misses', 'backlog_mb'):
+            record[name] = queue_stats.get(name, 0)
+        if self.metrics_stream is not None:
+            self.metrics_stream.append(record)
+
+        occupied = self.threat_pool.alive
+        self.trajectory.record(self.slot, self.uav_state.positions, self.threat_state.positions[occupied],
+                               self.threat_state.neutralized[:self.threat_state.size][occupied])
+        return record
+
+    @property
+    def visual_frames(self):
+        """Legacy list-of-dicts view of the trajectory; prefer self.trajectory."""
+        return self.trajectory.as_frames()
 
     def visualize(self):
         if self.mode == "ecop":
             return  # Skip animation for ECOP
 
+        from simulation.reporting import pyplot, _finish
+        plt = pyplot()
+        import matplotlib.animation as animation
+
         fig, ax = plt.subplots(figsize=(8, 8))
         ax.set_xlim(0, self.area_size)
         ax.set_ylim(0, self.area_size)
@@ -154,31 +300,24 @@ class DecentralizedUAVSystem:
         neutralized_scatter = ax.scatter([], [], c='green', marker='x', label='Neutralized')
         for uav in self.uavs:
             ax.text(uav.x, uav.y + 2, f"UAV-{uav.id}", color='blue', fontsize=8)
+        trajectory = self.trajectory
         def update(frame_idx):
-            frame = self.visual_frames[frame_idx]
-
-            device_data = np.array(frame['devices']) if frame['devices'] else np.empty((0, 2))
-            uav_data = np.array(frame['uavs']) if frame['uavs'] else np.empty((0, 2))
+            uav_data, threats, neutralized = trajectory.frame(frame_idx)
+            threat_data = threats[~neutralized]
+            neutralized_data = threats[neutralized]
 
-            threats_active = [p[:2] for p in frame['threats'] if not p[2]]
-            threats_neutralized = [p[:2] for p in frame['threats'] if p[2]]
-
-            threat_data = np.array(threats_active) if threats_active else np.empty((0, 2))
-            neutralized_data = np.array(threats_neutralized) if threats_neutralized else np.empty((0, 2))
-
-            device_scatter.set_offsets(device_data)
+            device_scatter.set_offsets(trajectory.devices)
             uav_scatter.set_offsets(uav_data)
             threat_scatter.set_offsets(threat_data)
             neutralized_scatter.set_offsets(neutralized_data)
 
             return device_scatter, uav_scatter, threat_scatter, neutralized_scatter
 
-        ani = animation.FuncAnimation(fig, update, frames=len(self.visual_frames), interval=1000, repeat=False)
+        ani = animation.FuncAnimation(fig, update, frames=len(trajectory), interval=1000, repeat=False)
         ax.legend()
-        plt.show()
 
-        
         from matplotlib.animation import PillowWriter
         ani.save("results/simulation.gif", writer=PillowWriter(fps=1))
-        plt.show()
+        _finish(plt)
+
 
@@ -0,0 +1,122 @@
+# simulation/sweep.py
+import glob
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+
+import numpy as np
+
+from simulation.experiment_runner import run_seeded, resolve_workers
+from simulation.scenario import Scenario
+
+SOURCE_DIRS = ('models', 'mpc', 'offloading', 'simulation')
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_code_version = None
+
+
+def code_version():
+    """Hash of the simulator sources, so cached results are dropped when the code changes."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for directory in SOURCE_DIRS:
+            for path in sorted(glob.glob(os.path.join(_ROOT, directory, '*.py'))):
+                digest.update(os.path.relpath(path, _ROOT).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def set_key(config, dotted, value):
+    node = config
+    *parents, leaf = dotted.split('.')
+    for key in parents:
+        node = node.setdefault(key, {})
+    node[leaf] = value
+
+
+def apply_overrides(base_config, overrides):
+    """Deep copy of `base_config` with dotted-key overrides applied; the base is never touched."""
+    config = deepcopy(base_config)
+    for dotted, value in overrides.items():
+        set_key(config, dotted, value)
+    return config
+
+
+def expand_grid(grid):
+    """Cartesian product of {dotted key: [values]} as a list of override dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def cache_key(config, seed):
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{canonical}|{seed}|{code_version()}".encode()).hexdigest()
+
+
+def estimate_cost(config):
+    """Rough relative run time, used to schedule the largest grid points first."""
+    entities = config['uav'].get('count', 3) + config['threats']['count'] + 1
+    return config['iot']['device_count'] * config['time_slots'] * entities
+
+
+def _run_point(job):
+    key, config, seed = job
+    return key, run_seeded(config, np.random.SeedSequence(seed))
+
+
+def run_sweep(base_config, grid, seeds=(0,), cache_dir='results/.sweep_cache', workers=None):
+    """Run every grid point for every seed, reusing results cached on disk.
+
+    Each result is cached under a hash of the canonical config, the seed and
+    the code version, so re-running a sweep only computes points that are
+    new or whose inputs changed. Missing points are submitted largest-first
+    to a process pool. Every point is compiled into a Scenario first, so an
+    invalid one fails the sweep before anything runs. Returns one entry per
+    (grid point, seed) in grid order.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    base = Scenario.from_config(base_config)
+    points = []
+    for overrides in expand_grid(grid):
+        config = base.override(overrides).to_config()
+        for seed in seeds:
+            points.append({'overrides': overrides, 'seed': seed, 'config': config,
+                           'key': cache_key(config, seed)})
+
+    results = {}
+    missing = []
+    for point in points:
+        path = os.path.join(cache_dir, f"{point['key']}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                results[point['key']] = json.load(f)['metrics']
+        else:
+            missing.append(point)
+
+    unique = {point['key']: point for point in missing}
+    jobs = sorted(((p['key'], deepcopy(p['config']), p['seed']) for p in unique.values()),
+                  key=lambda job: estimate_cost(job[1]), reverse=True)
+    print(f"[SWEEP] {len(points)} points, {len(points) - len(missing)} cached, {len(jobs)} to run")
+
+    workers = resolve_workers(base_config, workers)
+    if workers == 1 or len(jobs) <= 1:
+        outputs = list(map(_run_point, jobs))
+    else:
+        # pool.map hands jobs out in submission order, so the costliest start first
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_run_point, jobs))
+
+    for key, metrics in outputs:
+        point = unique[key]
+        results[key] = json.loads(json.dumps(metrics, default=float))
+        with open(os.path.join(cache_dir, f"{key}.json"), 'w') as f:
+            json.dump({'overrides': point['overrides'], 'seed': point['seed'],
+                       'code_version': code_version(), 'metrics': results[key]}, f)
+
+    return [{'overrides': p['overrides'], 'seed': p['seed'], 'metrics': results[p['key']],
+             'cached': p['key'] not in unique} for p in points]
@@ -0,0 +1,170 @@
+# simulation/trajectory.py
+import os
+import shutil
+import numpy as np
+
+
+# Ring size used when trajectory.capacity is unset; a run longer than this keeps its latest slots
+DEFAULT_CAPACITY = 1000
+
+
+class TrajectoryRecorder:
+    """Columnar per-slot record of UAV and threat state.
+
+    Device positions never change, so they are stored once. UAV positions
+    go into a preallocated (capacity x UAVs) array used as a ring buffer:
+    once `capacity` slots are recorded the oldest slot is overwritten.
+    Threats are recorded per row as only the occupied pool slots, packed
+    to the front with their count in `counts`, so the row width follows
+    the live threat count rather than the pool size; it starts at
+    `n_threats` and doubles when a slot has more. With `spill_dir` the
+    arrays are memory-mapped .npy files instead, and
+    TrajectoryRecorder.open() maps them back read-only.
+    """
+
+    COLUMNS = ('slots', 'uavs', 'threats', 'neutralized', 'counts')
+
+    def __init__(self, device_positions, n_uavs, n_threats, capacity, spill_dir=None):
+        self.capacity = max(1, int(capacity))
+        self.count = 0
+        self.spill_dir = spill_dir
+        width = max(1, int(n_threats))
+        shapes = {
+            'slots': ((self.capacity,), np.int64),
+            'uavs': ((self.capacity, n_uavs, 2), np.float64),
+            'threats': ((self.capacity, width, 2), np.float64),
+            'neutralized': ((self.capacity, width), np.bool_),
+            'counts': ((self.capacity,), np.int64),
+        }
+        devices = np.asarray(device_positions, dtype=np.float64).reshape(-1, 2)
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            np.save(os.path.join(spill_dir, 'devices.npy'), devices)
+            self.devices = np.load(os.path.join(spill_dir, 'devices.npy'), mmap_mode='r')
+        else:
+            self.devices = devices
+        for name, (shape, dtype) in shapes.items():
+            setattr(self, name, self._allocate(name, shape, dtype))
+
+    def _allocate(self, name, shape, dtype):
+        if not self.spill_dir:
+            return np.zeros(shape, dtype=dtype)
+        return np.lib.format.open_memmap(
+            os.path.join(self.spill_dir, f'{name}.npy'), mode='w+', dtype=dtype, shape=shape)
+
+    def _widen(self, width):
+        """Grow the threat columns to `width` entries per row, keeping what is recorded."""
+        for name in ('threats', 'neutralized'):
+            column = getattr(self, name)
+            shape = (self.capacity, width) + column.shape[2:]
+            if self.spill_dir:
+                path = os.path.join(self.spill_dir, f'{name}.npy')
+                grown = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=column.dtype, shape=shape)
+                grown[:, :column.shape[1]] = column
+                grown.flush()
+                del grown
+                os.replace(path + '.tmp', path)
+                grown = np.load(path, mmap_mode='r+')
+            else:
+                grown = np.zeros(shape, dtype=column.dtype)
+                grown[:, :column.shape[1]] = column
+            setattr(self, name, grown)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def record(self, t, uav_positions, threat_positions, neutralized):
+        """Record slot t; `threat_positions` and `neutralized` cover only the occupied threat slots."""
+        n = len(neutralized)
+        if n > self.neutralized.shape[1]:
+            self._widen(max(n, 2 * self.neutralized.shape[1]))
+        row = self.count % self.capacity
+        self.slots[row] = t
+        self.uavs[row] = uav_positions
+        self.threats[row, :n] = threat_positions
+        self.neutralized[row, :n] = neutralized
+        self.counts[row] = n
+        self.count += 1
+
+    def _row(self, i):
+        """Buffer row of the i-th retained slot in chronological order."""
+        if self.count <= self.capacity:
+            return i
+        return (self.count + i) % self.capacity
+
+    def frame(self, i):
+        """(uav positions, threat positions, neutralized flags) of retained slot i, as views."""
+        row = self._row(i)
+        n = self.counts[row]
+        return self.uavs[row], self.threats[row, :n], self.neutralized[row, :n]
+
+    def uav_track(self, uav, upto=None):
+        """Positions of one UAV over retained slots [0, upto); a view unless the ring has wrapped."""
+        upto = len(self) if upto is None else upto
+        if self.count <= self.capacity:
+            return self.uavs[:upto, uav]
+        return self.uavs[[self._row(i) for i in range(upto)], uav]
+
+    def as_frames(self):
+        """The legacy list-of-dicts layout of DecentralizedUAVSystem.visual_frames (copies)."""
+        devices = [tuple(p) for p in self.devices.tolist()]
+        frames = []
+        for i in range(len(self)):
+            uavs, threats, neutralized = self.frame(i)
+            frames.append({
+                'uavs': [tuple(p) for p in uavs.tolist()],
+                'devices': devices,
+                'threats': [(x, y, flag) for (x, y), flag in zip(threats.tolist(), neutralized.tolist())],
+            })
+        return frames
+
+    def flush(self):
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            if isinstance(column, np.memmap):
+                column.flush()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.spill_dir:
+            # Spilled columns stay on disk; only the cursor travels with a checkpoint
+            self.flush()
+            for name in self.COLUMNS + ('devices',):
+                del state[name]
+        return state
+
+    def reopen(self, spill_dir=None):
+        """Map the spilled columns back after a checkpoint load.
+
+        With a new `spill_dir` the files are copied there first, so the
+        original recording is left untouched.
+        """
+        if not self.spill_dir:
+            return
+        if spill_dir is not None and spill_dir != self.spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            for name in self.COLUMNS + ('devices',):
+                shutil.copyfile(os.path.join(self.spill_dir, f'{name}.npy'), os.path.join(spill_dir, f'{name}.npy'))
+            self.spill_dir = spill_dir
+        self.devices = np.load(os.path.join(self.spill_dir, 'devices.npy'), mmap_mode='r')
+        for name in self.COLUMNS:
+            setattr(self, name, np.load(os.path.join(self.spill_dir, f'{name}.npy'), mmap_mode='r+'))
+
+    @classmethod
+    def open(cls, spill_dir):
+        """Map a spilled recording back read-only."""
+        recorder = cls.__new__(cls)
+        recorder.spill_dir = spill_dir
+        recorder.devices = np.load(os.path.join(spill_dir, 'devices.npy'), mmap_mode='r')
+        for name in cls.COLUMNS:
+            setattr(recorder, name, np.load(os.path.join(spill_dir, f'{name}.npy'), mmap_mode='r'))
+        recorder.capacity = len(recorder.slots)
+        with open(os.path.join(spill_dir, 'count.txt')) as f:
+            recorder.count = int(f.read())
+        return recorder
+
+    def close(self):
+        if self.spill_dir:
+            self.flush()
+            with open(os.path.join(self.spill_dir, 'count.txt'), 'w') as f:
+                f.write(str(self.count))
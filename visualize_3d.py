@@ -1,16 +1,19 @@
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation, PillowWriter
 import numpy as np
+from simulation.reporting import pyplot, _finish
 
 def visualize_3d(frames, area_size, save_path="uav_simulation.gif"):
     """
     Creates a 3D animation of UAV movements over time.
 
     Args:
-        frames (list): Collected frames from DecentralizedUAVSystem.visual_frames
+        frames (TrajectoryRecorder or list): DecentralizedUAVSystem.trajectory, or
+            the legacy list of frame dicts
         area_size (int): Size of the simulation area
         save_path (str): Path to save the 3D animation (gif or mp4)
     """
+    plt = pyplot()
+    from matplotlib.animation import FuncAnimation, PillowWriter
+
     fig = plt.figure(figsize=(8, 6))
     ax = fig.add_subplot(111, projection="3d")
     ax.set_xlim(0, area_size)
@@ -20,18 +23,21 @@ def visualize_3d(frames, area_size, save_path="uav_simulation.gif"):
     ax.set_ylabel("Y")
     ax.set_zlabel("Time")
 
-    # Track UAV paths
-    num_uavs = len(frames[0]['uavs'])
-    uav_paths = [[] for _ in range(num_uavs)]
+    # UAV tracks are read straight from the recorder's columns
+    if isinstance(frames, list):
+        tracks = np.array([frame['uavs'] for frame in frames], dtype=float)
+        track = lambda i, upto: tracks[:upto, i]
+        num_uavs = tracks.shape[1]
+    else:
+        track = frames.uav_track
+        num_uavs = frames.uavs.shape[1]
     scatters = [ax.plot([], [], [], 'o', label=f"UAV {i}")[0] for i in range(num_uavs)]
 
     def update(frame_idx):
-        frame = frames[frame_idx]
-        for i, (x, y) in enumerate(frame['uavs']):
-            uav_paths[i].append((x, y, frame_idx))
-            path = np.array(uav_paths[i])
+        for i in range(num_uavs):
+            path = track(i, frame_idx + 1)
             scatters[i].set_data(path[:, 0], path[:, 1])
-            scatters[i].set_3d_properties(path[:, 2])
+            scatters[i].set_3d_properties(np.arange(frame_idx + 1))
         return scatters
 
     ani = FuncAnimation(fig, update, frames=len(frames), interval=200, blit=False)
@@ -47,4 +53,5 @@ def visualize_3d(frames, area_size, save_path="uav_simulation.gif"):
         raise ValueError("Unsupported format. Use .gif or .mp4")
 
     print(f"✅ 3D animation saved at {save_path}")
-    plt.show()
+    _finish(plt)
+